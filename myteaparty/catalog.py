@@ -0,0 +1,179 @@
+import datetime
+import threading
+import time
+
+from peewee import fn
+
+from .model import CatalogGeneration, Tea, TeaCount, TypeOfATea
+from .teaparty import app
+
+
+_known_generation = None
+_known_generation_updated = None
+_known_generation_checked_at = 0
+
+# All the CatalogDependentValue instances, for invalidate_catalog_values
+_catalog_values = []
+
+
+def get_catalog_generation():
+    '''
+    Returns the current catalog generation, a number increased each time
+    an import commits. In-memory structures built from the catalog store
+    the generation they were built from, and are rebuilt when it changes.
+
+    The database is only checked once every CATALOG_GENERATION_CHECK_INTERVAL
+    seconds, so this can be called on every request.
+    '''
+    global _known_generation, _known_generation_updated, _known_generation_checked_at
+
+    now = time.monotonic()
+    if (_known_generation is None
+            or now - _known_generation_checked_at >= app.config['CATALOG_GENERATION_CHECK_INTERVAL']):
+        generation, updated = (CatalogGeneration.select(fn.MAX(CatalogGeneration.generation),
+                                                        fn.MAX(CatalogGeneration.updated))
+                                                .tuples()
+                                                .get())
+        _known_generation = generation or 0
+        _known_generation_updated = updated
+        _known_generation_checked_at = now
+
+    return _known_generation
+
+
+def get_catalog_last_modified():
+    '''
+    Returns when the current catalog generation was committed (None if
+    there was no import yet), checked like get_catalog_generation.
+    '''
+    get_catalog_generation()
+    return _known_generation_updated
+
+
+def bump_catalog_generation():
+    '''
+    Increases the catalog generation. This should be called inside the import
+    transaction, so the new generation is visible exactly when the new data is.
+    '''
+    global _known_generation
+
+    updated = (CatalogGeneration.update(generation=CatalogGeneration.generation + 1,
+                                        updated=datetime.datetime.now())
+                                .execute())
+    if not updated:
+        CatalogGeneration.create(generation=1)
+
+    # Forces a re-check on the next call in this process
+    _known_generation = None
+
+
+def invalidate_catalog_values():
+    '''
+    Drops all the catalog dependent values of this process, and forces a
+    re-check of the catalog generation, so everything is reloaded from the
+    database on next access. Other processes only notice the changes through
+    the catalog generation (see bump_catalog_generation).
+    '''
+    global _known_generation
+
+    _known_generation = None
+    for value in _catalog_values:
+        value.invalidate()
+
+
+class CatalogDependentValue(object):
+    '''
+    A value built from the catalog (e.g. an index) and kept in memory by
+    the worker. It is built on first access, and rebuilt on access when the
+    catalog generation changed or after invalidate_catalog_values.
+    '''
+    def __init__(self, build):
+        self._build = build
+        self._built = (None, None)  # (generation, value)
+        self._lock = threading.Lock()
+
+        _catalog_values.append(self)
+
+    def invalidate(self):
+        with self._lock:
+            self._built = (None, None)
+
+    def get(self):
+        generation = get_catalog_generation()
+        built_generation, value = self._built
+
+        if built_generation != generation:
+            with self._lock:
+                if self._built[0] != generation:
+                    self._built = (generation, self._build())
+                value = self._built[1]
+
+        return value
+
+
+def update_catalog_counts():
+    '''
+    Recomputes the teas counters (see TeaCount) from the catalog. Like
+    bump_catalog_generation, this should be called inside the import
+    transaction.
+    '''
+    not_deleted = Tea.deleted.is_null()
+
+    TeaCount.delete().execute()
+
+    TeaCount.insert_from(
+        [TeaCount.count],
+        Tea.select(fn.COUNT(Tea.id)).where(not_deleted)
+    ).execute()
+
+    TeaCount.insert_from(
+        [TeaCount.vendor, TeaCount.count],
+        Tea.select(Tea.vendor, fn.COUNT(Tea.id)).where(not_deleted).group_by(Tea.vendor)
+    ).execute()
+
+    TeaCount.insert_from(
+        [TeaCount.tea_type, TeaCount.count],
+        (TypeOfATea.select(TypeOfATea.tea_type, fn.COUNT(fn.DISTINCT(Tea.id)))
+                   .join(Tea)
+                   .where(not_deleted)
+                   .group_by(TypeOfATea.tea_type))
+    ).execute()
+
+    TeaCount.insert_from(
+        [TeaCount.tea_type, TeaCount.vendor, TeaCount.count],
+        (TypeOfATea.select(TypeOfATea.tea_type, Tea.vendor, fn.COUNT(fn.DISTINCT(Tea.id)))
+                   .join(Tea)
+                   .where(not_deleted)
+                   .group_by(TypeOfATea.tea_type, Tea.vendor))
+    ).execute()
+
+
+class CatalogCounts(object):
+    '''
+    The teas counters, loaded in memory.
+    '''
+    def __init__(self):
+        self._counts = {}
+
+    @classmethod
+    def load(cls):
+        counts = cls()
+        counts._counts = {(tea_type_id, vendor_id): count for tea_type_id, vendor_id, count
+                          in TeaCount.select(TeaCount.tea_type, TeaCount.vendor, TeaCount.count).tuples()}
+        return counts
+
+    def count(self, tea_type=None, vendor=None):
+        '''
+        Returns the amount of teas of the given type and/or vendor (models
+        or ids), or of all teas if none is given.
+        '''
+        tea_type_id = getattr(tea_type, 'id', tea_type)
+        vendor_id = getattr(vendor, 'id', vendor)
+
+        return self._counts.get((tea_type_id, vendor_id), 0)
+
+    def items(self):
+        '''
+        Returns all the counters, as ((type id, vendor id), count) tuples.
+        '''
+        return sorted(self._counts.items(), key=lambda item: repr(item[0]))
@@ -3,5 +3,10 @@ from ..model import pwdb
 
 from .import_teas import *  # noqa
 from .generate_thumbnails import *  # noqa
+from .fill_tips import *  # noqa
+from .export_static import *  # noqa
+from .lists import *  # noqa
+from .bench import *  # noqa
+from .migrations import *  # noqa
 
 app.cli.add_command(pwdb.cli, 'db')
@@ -0,0 +1,262 @@
+import click
+import importlib
+import logging
+import random
+import tempfile
+import time
+
+from path import Path
+from peewee import SqliteDatabase
+from slugify import slugify
+from urllib.parse import quote
+
+from ..catalog import bump_catalog_generation, update_catalog_counts
+from ..model import database, Tea, TeaVendor, TeaType, TypeOfATea, TeaList, TeaListItem, CatalogGeneration, \
+    TeaCount
+from ..search import search_backends
+from ..search.normalize import search_keys
+from ..teaparty import app
+from ..tips import tips_summary
+
+
+# The requests made for each catalog size and backend: exact searches, typos,
+# a deep page, and the kind of probes the catch-all search fallback receives.
+BENCH_REQUESTS = [
+    '/search?q=thé+vert',
+    '/search?q=darjeeling',
+    '/search?q=marco+polo',
+    '/search?q=fruits+rouges',
+    '/search?q=bergamote',
+    '/search?q=the+au+jasmin',
+    '/search?q=thé&page=5',
+    '/search?q=darjeling',
+    '/search?q=marco+pollo',
+    '/search?q=TC1042',
+    '/jasmin',
+    '/earl',
+    '/wp-login.php',
+    '/favicon.ico',
+    '/.env'
+]
+
+_names_first = ['Marco', 'Earl', 'Jardin', 'Rêve', 'Soleil', 'Matin', 'Nuit', 'Fleur', 'Esprit', 'Voyage',
+                'Darjeeling', 'Assam', 'Sencha', 'Ceylan', 'Yunnan', 'Oolong', 'Rooibos', 'Pu-Erh', 'Lapsang']
+_names_second = ['Polo', 'Grey', 'd\'Été', 'Impérial', 'de Noël', 'Bleu', 'Doré', 'des Lords', 'du Tigre', 'Royal',
+                 'Castleton', 'Himalaya', 'de Chine', 'Fumé', 'Vert', 'Blanc', 'Rouge', 'Sacré', 'de Paris']
+_flavours = ['bergamote', 'fruits rouges', 'jasmin', 'vanille', 'caramel', 'agrumes', 'rose', 'menthe', 'pêche',
+             'fleurs blanches', 'épices douces', 'châtaigne', 'mangue', 'fruits de la passion', 'cannelle']
+_sentences = [
+    'Un thé {kind} aux notes de {flavour}, à déguster tout au long de la journée.',
+    'Récolté à la main sur les hauts plateaux, ce thé {kind} révèle une liqueur ambrée.',
+    'Ses feuilles entières libèrent un parfum de {flavour} d\'une grande délicatesse.',
+    'Idéal en fin d\'après-midi, il accompagne à merveille les pâtisseries françaises.',
+    'Une création de la maison, où le thé {kind} rencontre la {flavour}.',
+    'La tasse est ronde et veloutée, avec une finale persistante de {flavour}.'
+]
+_kinds = ['noir', 'vert', 'blanc', 'bleu', 'jaune', 'rouge', 'fumé']
+
+
+class _QueriesCounter(logging.Handler):
+    '''
+    Counts the queries logged by peewee.
+    '''
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def _generate_catalog(size, rand):
+    '''
+    Fills the (empty) database with size synthetic teas.
+    '''
+    vendors = [
+        TeaVendor.create(name=name, slug=slugify(name), description='', link=f'https://{slugify(name)}.example',
+                         order=order)
+        for order, name in enumerate(['Maison du Thé', 'Les Jardins de Ceylan', 'Thés du Monde'])
+    ]
+    types = [
+        TeaType.create(name=f'Thé {kind}', slug=kind, is_origin=False, order=order)
+        for order, kind in enumerate(_kinds)
+    ]
+
+    teas = []
+    for i in range(size):
+        kind = rand.choice(_kinds)
+        name = f'{rand.choice(_names_first)} {rand.choice(_names_second)}'
+        fill = {'kind': kind, 'flavour': rand.choice(_flavours)}
+
+        tea = {
+            'name': name,
+            'slug': f'{slugify(name)}-{i}',
+            'vendor': vendors[i % len(vendors)],
+            'vendor_internal_id': f'TC{1000 + i}',
+            'description': f'Thé {kind} aux notes de {rand.choice(_flavours)}',
+            'long_description': ''.join(f'<p>{rand.choice(_sentences).format(**fill)}</p>'
+                                        for _ in range(rand.randint(2, 6))),
+            'illustration': '',
+            'link': '',
+            'tips_mass': rand.choice([2000, 2500, 3000, -1]),
+            'tips_volume': rand.choice([20, 25, 30]),
+            'tips_temperature': rand.choice([70, 80, 90, 95]),
+            'tips_duration': rand.choice([120, 180, 240, 300])
+        }
+        tea.update(search_keys(tea))
+        tea.update(tips_summary(tea))
+        teas.append(tea)
+
+    with database.atomic():
+        # Small batches, so the SQLite variables limit is never reached
+        for start in range(0, len(teas), 40):
+            Tea.insert_many(teas[start:start + 40]).execute()
+
+        types_by_kind = {tea_type.slug: tea_type for tea_type in types}
+        teas_types = [{'tea': tea_id, 'tea_type': types_by_kind[rand.choice(_kinds)]}
+                      for tea_id, in Tea.select(Tea.id).tuples()]
+        for start in range(0, len(teas_types), 400):
+            TypeOfATea.insert_many(teas_types[start:start + 400]).execute()
+
+
+def _percentile(durations, percent):
+    durations = sorted(durations)
+    return durations[min(len(durations) - 1, int(round(percent / 100 * (len(durations) - 1))))]
+
+
+@app.cli.group('bench')
+def bench_command():
+    '''
+    Benchmarks of the application.
+    '''
+    pass
+
+
+@bench_command.command('search')
+@click.option('--sizes', default='1000,10000,100000', show_default=True,
+              help='The sizes of the synthetic catalogs, comma-separated')
+@click.option('--backend', 'backends', multiple=True,
+              help='A search backend to benchmark (can be repeated); defaults to all of them')
+@click.option('--rounds', default=5, show_default=True, help='How many times the requests are made')
+@click.option('--with-cache', is_flag=True, default=False,
+              help='If specified, the search results cache is kept between the requests')
+def bench_search_command(sizes, backends, rounds, with_cache):
+    '''
+    Measures the search latency against synthetic catalogs.
+
+    For each size, a scratch SQLite database is filled with random teas,
+    then a fixed set of searches (including typos and catch-all fallback
+    probes) is requested through the application. The first request of
+    each backend, building its in-memory data if any, is not measured.
+
+    The search results cache is emptied before each request, so the backends
+    themselves are measured, unless --with-cache is given.
+    '''
+    # Imported here as they register views on import
+    from ..views import search as search_views
+    from .. import search
+
+    backends = backends or sorted(search_backends.keys())
+    sizes = [int(size) for size in sizes.split(',') if size.strip()]
+
+    fulltext_migration = importlib.import_module('myteaparty.migrations.004_fulltext_search')
+
+    original_database = database.obj
+    original_backend = app.config['SEARCH_BACKEND']
+    scratch_dir = Path(tempfile.mkdtemp(prefix='myteaparty-bench-'))
+
+    queries_counter = _QueriesCounter()
+    peewee_logger = logging.getLogger('peewee')
+    peewee_logger_level = peewee_logger.level
+    peewee_logger.addHandler(queries_counter)
+    peewee_logger.setLevel(logging.DEBUG)
+
+    client = app.test_client()
+
+    try:
+        for run, size in enumerate(sizes):
+            click.echo(click.style(f'\nCatalog of {size} teas', bold=True))
+
+            database.initialize(SqliteDatabase(scratch_dir / f'bench-{size}.sqlite'))
+            database.create_tables([TeaVendor, TeaType, Tea, TypeOfATea, TeaList, TeaListItem, CatalogGeneration,
+                                    TeaCount])
+            for statement in fulltext_migration.SQLITE_MIGRATE:
+                database.execute_sql(statement)
+
+            click.echo('Generating the catalog...', nl=False)
+            _generate_catalog(size, random.Random(size))
+
+            # A generation never seen by this process, so the in-memory
+            # indexes are rebuilt for this catalog
+            CatalogGeneration.create(generation=run * 2)
+            update_catalog_counts()
+            bump_catalog_generation()
+            click.echo(' Done.')
+
+            # The requests open their own connection
+            database.close()
+
+            click.echo(f'Search results cache: {"kept" if with_cache else "emptied before each request"}')
+            click.echo(f'{"backend":<10} {"p50":>10} {"p95":>10} {"p99":>10} {"queries/request":>16} '
+                       f'{"non-2xx":>8}')
+
+            for backend in backends:
+                app.config['SEARCH_BACKEND'] = backend
+                search._search_backend = None
+                search_views._search_cache.clear()
+
+                try:
+                    status = client.get(BENCH_REQUESTS[0]).status_code
+                    if status >= 500:
+                        raise Exception(f'HTTP {status} on {BENCH_REQUESTS[0]}')
+                except Exception as e:
+                    click.echo(f'{backend:<10} failed: {e}', err=True)
+                    continue
+
+                durations = []
+                not_ok = 0
+                failure = None
+                queries_counter.count = 0
+
+                for _ in range(rounds):
+                    for url in BENCH_REQUESTS:
+                        if not with_cache:
+                            search_views._search_cache.clear()
+
+                        start = time.perf_counter()
+                        status = client.get(quote(url, safe='/?=&+')).status_code
+                        durations.append((time.perf_counter() - start) * 1000)
+
+                        # The errors would be timed as results: the backend
+                        # is not measured. Redirections (single results) and
+                        # not found pages (probes) are answers, but counted.
+                        if status >= 500:
+                            failure = f'HTTP {status} on {url}'
+                            break
+                        if not 200 <= status < 300:
+                            not_ok += 1
+                    if failure:
+                        break
+
+                if failure:
+                    click.echo(f'{backend:<10} failed: {failure}', err=True)
+                    continue
+
+                click.echo(f'{backend:<10} '
+                           f'{_percentile(durations, 50):>7.2f} ms '
+                           f'{_percentile(durations, 95):>7.2f} ms '
+                           f'{_percentile(durations, 99):>7.2f} ms '
+                           f'{queries_counter.count / len(durations):>16.2f} '
+                           f'{not_ok // rounds:>8}')
+
+            if not database.is_closed():
+                database.close()
+    finally:
+        peewee_logger.removeHandler(queries_counter)
+        peewee_logger.setLevel(peewee_logger_level)
+
+        database.initialize(original_database)
+        app.config['SEARCH_BACKEND'] = original_backend
+        search._search_backend = None
+
+        scratch_dir.rmtree_p()
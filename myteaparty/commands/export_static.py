@@ -0,0 +1,183 @@
+import click
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+
+from flask import url_for
+from path import Path
+
+from ..model import database
+from ..snapshot import get_catalog_snapshot
+from ..teaparty import app
+
+
+# Kept in the export directory, with the digest of the inputs of each
+# exported page, so the next export only renders the pages that changed.
+EXPORT_MANIFEST = '.export-manifest.json'
+
+# The settings the catalog pages depend on, besides the catalog itself
+_exported_settings = ('ITEMS_PER_PAGE', 'STATIC_FILES_FOLDER', 'STATIC_FILES_FORMATS', 'PIWIK_URL', 'PIWIK_SITE_ID',
+                      'COOKIE_LISTS', 'COOKIE_FAVORITES_LIST', 'COOKIE_LAST_VIEWED_LIST')
+
+
+def _page_filename(url, page=1):
+    '''
+    The file a page is exported to: the first page of each URL goes to its
+    index.html, and the next ones to page-<number>.html beside it.
+    '''
+    return os.path.join(url.strip('/'), 'index.html' if page == 1 else f'page-{page}.html')
+
+
+def _templates_digest():
+    digest = hashlib.sha1()
+    for template in sorted((Path(app.root_path) / app.template_folder).walkfiles()):
+        digest.update(template.encode('utf-8'))
+        digest.update(template.bytes())
+
+    return digest.hexdigest()
+
+
+def _listing_pages(snapshot, url, listing, inputs):
+    '''
+    Yields the (url, filename, inputs) of each page of a catalog listing.
+    '''
+    paginate_by = app.config['ITEMS_PER_PAGE']
+    pages = max(1, math.ceil(len(listing) / paginate_by))
+
+    for page in range(1, pages + 1):
+        teas = listing.teas[(page - 1) * paginate_by:page * paginate_by]
+        yield (f'{url}?page={page}' if page > 1 else url,
+               _page_filename(url, page),
+               (inputs, len(listing), snapshot.counts.items(), tuple(tea.as_tuple() for tea in teas)))
+
+
+def catalog_pages(snapshot):
+    '''
+    Yields the (url, filename, inputs) of all the public catalog pages: the
+    teas (the deleted ones included), the listings, and the about page.
+    The inputs are all the data a page is rendered from.
+    '''
+    vendors = tuple(vendor.as_tuple() for vendor in snapshot.vendors)
+
+    yield url_for('about'), _page_filename(url_for('about')), vendors
+
+    yield from _listing_pages(snapshot, url_for('all_teas'), snapshot.get_listing(),
+                              tuple(tea_type.as_tuple() for tea_type in snapshot.get_types(is_origin=False)))
+
+    for tea_type in snapshot.types:
+        yield from _listing_pages(snapshot, url_for('by_type', tea_type_slug=tea_type.slug),
+                                  snapshot.get_listing(tea_type=tea_type),
+                                  tuple(other_type.as_tuple() for other_type
+                                        in snapshot.get_types(is_origin=tea_type.is_origin)))
+
+    for vendor in snapshot.vendors:
+        yield from _listing_pages(snapshot, url_for('by_vendor', vendor_slug=vendor.slug),
+                                  snapshot.get_listing(vendor=vendor), (vendor.id, vendors))
+
+    for tea in snapshot.teas_by_id.values():
+        url = url_for('tea', tea_vendor=tea.vendor_slug, tea_slug=tea.slug)
+        yield url, _page_filename(url), tea.as_tuple()
+
+
+def _export_pages(job):
+    '''
+    Renders the given pages (as an anonymous user) and writes them. Runs in
+    the processes pool.
+
+    :return: A list of (filename, HTTP status) tuples.
+    '''
+    directory, base_url, pages = job
+    client = app.test_client()
+    exported = []
+
+    for url, filename in pages:
+        response = client.get(url, base_url=base_url)
+        if response.status_code == 200:
+            target = Path(directory) / filename
+            target.parent.makedirs_p()
+
+            # Written aside then renamed, so a page is never served half-written
+            temporary = target + '.tmp'
+            temporary.write_bytes(response.get_data())
+            temporary.rename(target)
+
+        exported.append((filename, response.status_code))
+
+    return exported
+
+
+@app.cli.command('export-static')
+@click.option('--directory',
+              default=Path(app.root_path).parent / 'export',
+              show_default=True,
+              help='The directory the pages are exported to')
+@click.option('--base-url',
+              default='http://localhost/',
+              show_default=True,
+              help='The public URL of the site, used in the absolute links')
+@click.option('--processes', type=int, default=None, help='The amount of rendering processes [default: CPU count]')
+@click.option('--force', is_flag=True, default=False, help='If specified, all the pages are rendered again')
+def export_static_command(directory, base_url, processes, force):
+    '''
+    Exports the public catalog pages (teas, listings, about) as static files,
+    so a front-end web server can serve them without the application. The
+    user's lists are loaded by the tea pages from the application.
+
+    Only the pages whose data or templates changed since the last export are
+    rendered again. A listing page number N is exported to page-N.html beside
+    the index.html of the listing (e.g. with nginx,
+    try_files $uri/page-$arg_page.html $uri/index.html @app).
+    '''
+    directory = Path(directory)
+    directory.makedirs_p()
+
+    manifest_file = directory / EXPORT_MANIFEST
+    manifest = json.loads(manifest_file.text()) if manifest_file.exists() and not force else {}
+
+    snapshot = get_catalog_snapshot()
+    common_inputs = (_templates_digest(), base_url, [(name, app.config.get(name)) for name in _exported_settings])
+
+    with app.test_request_context(base_url=base_url):
+        pages = list(catalog_pages(snapshot))
+
+    digests = {}
+    to_export = []
+    for url, filename, inputs in pages:
+        digests[filename] = hashlib.sha1(repr((common_inputs, inputs)).encode('utf-8')).hexdigest()
+        if manifest.get(filename) != digests[filename] or not (directory / filename).exists():
+            to_export.append((url, filename))
+
+    click.echo(f'{len(to_export)} pages out of {len(pages)} to export.')
+
+    # Each process opens its own connection
+    if not database.is_closed():
+        database.close()
+
+    failed = []
+    jobs = [(directory, base_url, to_export[start:start + 50]) for start in range(0, len(to_export), 50)]
+
+    with multiprocessing.Pool(processes) as pool:
+        with click.progressbar(length=len(to_export), label='Exporting pages') as bar:
+            for exported in pool.imap_unordered(_export_pages, jobs):
+                for filename, status in exported:
+                    if status != 200:
+                        # Kept as they were, to be tried again next time
+                        failed.append((filename, status))
+                        if filename in manifest:
+                            digests[filename] = manifest[filename]
+                        else:
+                            del digests[filename]
+                bar.update(len(exported))
+
+    # The pages which no longer exist are removed
+    for filename in set(manifest) - set(digests):
+        (directory / filename).remove_p()
+
+    manifest_file.write_text(json.dumps(digests, indent=0, sort_keys=True))
+
+    for filename, status in failed:
+        click.echo(f'Unable to export {filename} (HTTP {status}).', err=True)
+
+    click.echo('Done.')
@@ -0,0 +1,19 @@
+import click
+
+from ..catalog import bump_catalog_generation, invalidate_catalog_values
+from ..model import database
+from ..teaparty import app
+from ..tips import fill_tips_summaries
+
+
+@app.cli.command('fill-tips')
+def fill_tips_command():
+    '''
+    (Re)Computes the brewing summaries displayed for all the teas.
+    '''
+    with database.atomic():
+        count = fill_tips_summaries()
+        bump_catalog_generation()
+    invalidate_catalog_values()
+
+    click.echo(f'Updated the brewing summaries of {count} teas.')
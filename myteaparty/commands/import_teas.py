@@ -10,9 +10,12 @@ from itertools import cycle, islice, groupby
 from path import Path
 from slugify import slugify
 
+from ..catalog import bump_catalog_generation, invalidate_catalog_values, update_catalog_counts
 from ..teaparty import app
 from ..model import Tea, TeaType, TypeOfATea, TeaVendor, database
 from ..model import get_or_create as get_or_create_model
+from ..search.normalize import search_keys
+from ..tips import tips_summary
 
 
 class TeaVendorImporter(object):
@@ -305,6 +308,9 @@ def import_command(dry_run, importer):
             if data['illustration'] is None:
                 del data['illustration']
 
+            data.update(search_keys(data))
+            data.update(tips_summary(data))
+
             updated = (Tea.update(**data)
                           .where((Tea.vendor_internal_id == str(data['vendor_internal_id'])) &
                                  (Tea.vendor == vendor))
@@ -419,5 +425,8 @@ def import_command(dry_run, importer):
         database.rollback()
     else:
         click.echo('Committing changes...', nl=False)
+        update_catalog_counts()
+        bump_catalog_generation()
         database.commit()
+        invalidate_catalog_values()
     click.echo(' Done.')
@@ -0,0 +1,29 @@
+import click
+
+from ..lists_gc import clear_expired_share_keys, delete_abandoned_lists
+from ..teaparty import app
+
+
+@app.cli.group('lists')
+def lists_command():
+    '''
+    Maintenance of the users' lists.
+    '''
+    pass
+
+
+@lists_command.command('gc')
+@click.option('--older-than', type=click.IntRange(min=0), default=None,
+              help='The age (in days) after which the abandoned lists are deleted [default: LISTS_ABANDONED_AFTER]')
+@click.option('--batch-size', type=click.IntRange(min=1), default=None,
+              help='The amount of rows changed per statement [default: LISTS_GC_BATCH_SIZE]')
+def lists_gc_command(older_than, batch_size):
+    '''
+    Clears the expired sharing keys, and deletes the empty lists never used
+    again since their creation. Can run while the application is up.
+    '''
+    cleared = clear_expired_share_keys(batch_size)
+    click.echo(f'Cleared {cleared} expired sharing keys.')
+
+    deleted = delete_abandoned_lists(older_than, batch_size)
+    click.echo(f'Deleted {deleted} abandoned lists.')
@@ -0,0 +1,30 @@
+from functools import wraps
+
+from ..catalog import bump_catalog_generation, invalidate_catalog_values
+from ..model import CatalogGeneration, database, pwdb
+
+
+def invalidating_catalog(command):
+    '''
+    Wraps a migrations command so the catalog data kept in memory by the
+    workers (snapshot, vendors and types, counters, search index...) is
+    reloaded once it ran, as migrations may change the catalog tables.
+    '''
+    @wraps(command)
+    def invalidating_command(*args, **kwargs):
+        result = command(*args, **kwargs)
+
+        # The generation table does not exist before the 003 migration
+        if CatalogGeneration.table_exists():
+            with database.atomic():
+                bump_catalog_generation()
+        invalidate_catalog_values()
+
+        return result
+
+    return invalidating_command
+
+
+for _command_name in ('migrate', 'rollback'):
+    _command = pwdb.cli.commands[_command_name]
+    _command.callback = invalidating_catalog(_command.callback)
@@ -1,7 +1,6 @@
 # Database connection
 
 # See http://docs.peewee-orm.com/en/latest/peewee/database.html#connecting-using-a-database-url
-# Warning: search will not work with SQLite as it uses SQL functions not implemented in this driver.
 # DATABASE = 'mysql://user:passwd@ip:port/my_db'
 DATABASE = ''
 
@@ -14,8 +13,27 @@ DATABASE_CONNECTION_PARAMS = {}
 TEA_IMPORTERS_PACKAGE = 'myteaparty.commands.tea_importers'
 
 
+# Catalog
+
+# The workers keep some catalog data in memory. They check if an import
+# changed the catalog at most once per this delay (in seconds).
+CATALOG_GENERATION_CHECK_INTERVAL = 10
+
+# The rendered catalog listings pages (all teas, by type, by vendor) are
+# cached by each worker until the next import. This is the maximal amount
+# of pages kept.
+LISTINGS_CACHE_SIZE = 512
+
+
 # Search options
 
+# The search backend.
+# - 'index': an inverted index kept in memory by each worker, rebuilt after each import;
+# - 'fulltext': the database's own full-text index (FTS5 with SQLite, FULLTEXT with MySQL),
+#               created by the 004_fulltext_search migration;
+# - 'sql': plain SQL queries, scanning the teas table on each search.
+SEARCH_BACKEND = 'index'
+
 # The weight of the fields when searching for a tea using keywords.
 SEARCH_WEIGHTS = {
     'name': 20,
@@ -26,6 +44,21 @@ SEARCH_WEIGHTS = {
 
 ITEMS_PER_PAGE = 12
 
+# Search results (including empty ones) are cached by each worker, until
+# the next import or for this delay (in seconds).
+SEARCH_CACHE_SIZE = 2048
+SEARCH_CACHE_TTL = 3600
+
+# When nothing matches a search, teas with a similar name or vendor code are
+# searched instead, to tolerate typos. The similarity is the share of the
+# trigrams of the query found in the tea name, from 0 to 1.
+SEARCH_TYPO_TOLERANCE = True
+SEARCH_TYPO_MIN_SIMILARITY = 0.6
+SEARCH_TYPO_MAX_RESULTS = 24
+
+# The maximal amount of suggestions returned while typing a search.
+SEARCH_SUGGESTIONS_LIMIT = 8
+
 
 # Static files storage
 
@@ -46,6 +79,34 @@ LISTS_DEFAULT_NAME = 'Liste par défaut'
 LISTS_FAVORITES_NAME = 'Favoris'
 SHARE_KEY_EXPIRES_AFTER = 1  # In hours
 
+# The amount of random sharing keys tried before giving up (then the sync
+# page fails). Collisions only happen with keys still valid.
+SHARE_KEY_ALLOCATION_ATTEMPTS = 20
+
+# The maximal amount of operations sent at once to a list's batch endpoint.
+LISTS_BATCH_MAX_OPERATIONS = 1000
+
+# The QR codes of the sharing keys are cached by each worker until the keys
+# expire. This is the maximal amount of images kept.
+QR_CODES_CACHE_SIZE = 256
+
+# The empty lists never used again after their creation (i.e. in a request
+# at least LISTS_REVISIT_DELAY hours later, e.g. the favorites lists created
+# for visitors who only came once) are deleted by the lists garbage collector
+# (flask lists gc) once older than LISTS_ABANDONED_AFTER days. The collector
+# also clears the expired sharing keys.
+LISTS_ABANDONED_AFTER = 30  # In days
+LISTS_REVISIT_DELAY = 1  # In hours
+
+# The garbage collector updates or deletes the rows by chunks of this size,
+# each in its own statement, so the lists tables are never locked for long.
+LISTS_GC_BATCH_SIZE = 500
+
+# If set, each worker runs the lists garbage collector in the background
+# every this many seconds. Leave to None to run the command instead (e.g.
+# from cron).
+LISTS_GC_INTERVAL = None
+
 
 # Cookies
 
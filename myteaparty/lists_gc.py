@@ -0,0 +1,114 @@
+import threading
+
+from datetime import datetime, timedelta
+from peewee import fn
+
+from .model import database, TeaList, TeaListItem
+from .teaparty import app
+
+
+_scheduler = None
+
+
+def _in_batches(query, update, batch_size):
+    '''
+    Selects the IDs matching query by chunks of batch_size, and gives each
+    chunk to update (which returns the amount of rows changed). Each chunk is
+    a separate short statement, so the tables are never locked for long.
+    Returns the total amount of rows changed.
+    '''
+    total = 0
+    while True:
+        ids = [row_id for row_id, in query.limit(batch_size).tuples()]
+        if not ids:
+            return total
+
+        total += update(ids)
+        if len(ids) < batch_size:
+            return total
+
+
+def clear_expired_share_keys(batch_size=None):
+    '''
+    Removes the sharing keys which expired, so they are free for the next
+    lists to sync. Returns the amount of lists updated.
+    '''
+    now = datetime.now()
+
+    return _in_batches(
+        TeaList.select(TeaList.id).where(TeaList.share_key_valid_until < now),
+        lambda ids: (TeaList.update(share_key=None, share_key_valid_until=None)
+                            .where((TeaList.id << ids) & (TeaList.share_key_valid_until < now))
+                            .execute()),
+        app.config['LISTS_GC_BATCH_SIZE'] if batch_size is None else batch_size
+    )
+
+
+def delete_abandoned_lists(older_than=None, batch_size=None):
+    '''
+    Deletes the empty lists created more than older_than days ago (default:
+    LISTS_ABANDONED_AFTER) and never used again since (see
+    LISTS_REVISIT_DELAY), e.g. the favorites lists created for visitors who
+    only came once. Returns the amount of lists deleted.
+    '''
+    if older_than is None:
+        older_than = app.config['LISTS_ABANDONED_AFTER']
+    created_before = datetime.now() - timedelta(days=older_than)
+
+    def abandoned(query):
+        return query.where(TeaList.revisited_at.is_null() & (TeaList.created_at < created_before))
+
+    def delete(ids):
+        # Checked again as a tea may have been added meanwhile (peewee does
+        # not alias the correlated subqueries of a DELETE, hence NOT IN)
+        lists_with_teas = TeaListItem.select(TeaListItem.tea_list).where(TeaListItem.tea_list << ids)
+        return abandoned(TeaList.delete()).where((TeaList.id << ids) & ~(TeaList.id << lists_with_teas)).execute()
+
+    return _in_batches(
+        abandoned(TeaList.select(TeaList.id)).where(
+            ~fn.EXISTS(TeaListItem.select(TeaListItem.tea).where(TeaListItem.tea_list == TeaList.id))
+        ),
+        delete,
+        app.config['LISTS_GC_BATCH_SIZE'] if batch_size is None else batch_size
+    )
+
+
+def collect_lists_garbage(older_than=None, batch_size=None):
+    '''
+    Clears the expired sharing keys and deletes the abandoned lists. Returns
+    the amount of keys cleared and of lists deleted.
+    '''
+    return clear_expired_share_keys(batch_size), delete_abandoned_lists(older_than, batch_size)
+
+
+def _run_scheduler(interval, stopped):
+    while not stopped.wait(interval):
+        try:
+            cleared, deleted = collect_lists_garbage()
+            app.logger.info('Lists garbage collection: %d sharing keys cleared, %d lists deleted.',
+                            cleared, deleted)
+        except Exception:
+            app.logger.exception('Lists garbage collection failed.')
+        finally:
+            if not database.is_closed():
+                database.close()
+
+
+def start_lists_gc_scheduler():
+    '''
+    Runs collect_lists_garbage in a background thread of this process, every
+    LISTS_GC_INTERVAL seconds, if set. Returns the threading.Event stopping
+    it, or None if disabled. Each worker runs its own; the collection can run
+    concurrently, as it only changes rows still matching once locked.
+    '''
+    global _scheduler
+
+    if not app.config['LISTS_GC_INTERVAL']:
+        return None
+
+    if _scheduler is None:
+        _scheduler = threading.Event()
+        threading.Thread(target=_run_scheduler, args=(app.config['LISTS_GC_INTERVAL'], _scheduler),
+                         name='lists-gc', daemon=True).start()
+
+    return _scheduler
@@ -0,0 +1,103 @@
+"""Peewee migrations -- 004_fulltext_search.py.
+
+Some examples (model - class or model name)::
+
+    > Model = migrator.orm['model_name']            # Return model in current state by name
+
+    > migrator.sql(sql)                             # Run custom SQL
+    > migrator.python(func, *args, **kwargs)        # Run python code
+    > migrator.create_model(Model)                  # Create a model (could be used as decorator)
+    > migrator.remove_model(model, cascade=True)    # Remove a model
+    > migrator.add_fields(model, **fields)          # Add fields to a model
+    > migrator.change_fields(model, **fields)       # Change fields
+    > migrator.remove_fields(model, *field_names, cascade=True)
+    > migrator.rename_field(model, old_field_name, new_field_name)
+    > migrator.rename_table(model, new_table_name)
+    > migrator.add_index(model, *col_names, unique=False)
+    > migrator.drop_index(model, *col_names)
+    > migrator.add_not_null(model, *field_names)
+    > migrator.drop_not_null(model, *field_names)
+    > migrator.add_default(model, field_name, default)
+
+"""
+
+import peewee as pw
+
+
+SQLITE_MIGRATE = [
+    # An external content FTS5 table: only the index is stored, the content is read from tea_teas
+    """CREATE VIRTUAL TABLE tea_teas_fts USING fts5(
+        name, vendor_id, description, long_description,
+        content='tea_teas', content_rowid='id', tokenize='unicode61 remove_diacritics 1'
+    )""",
+    """CREATE TRIGGER tea_teas_fts_insert AFTER INSERT ON tea_teas BEGIN
+        INSERT INTO tea_teas_fts(rowid, name, vendor_id, description, long_description)
+        VALUES (new.id, new.name, new.vendor_id, new.description, new.long_description);
+    END""",
+    """CREATE TRIGGER tea_teas_fts_delete AFTER DELETE ON tea_teas BEGIN
+        INSERT INTO tea_teas_fts(tea_teas_fts, rowid, name, vendor_id, description, long_description)
+        VALUES ('delete', old.id, old.name, old.vendor_id, old.description, old.long_description);
+    END""",
+    """CREATE TRIGGER tea_teas_fts_update AFTER UPDATE ON tea_teas BEGIN
+        INSERT INTO tea_teas_fts(tea_teas_fts, rowid, name, vendor_id, description, long_description)
+        VALUES ('delete', old.id, old.name, old.vendor_id, old.description, old.long_description);
+        INSERT INTO tea_teas_fts(rowid, name, vendor_id, description, long_description)
+        VALUES (new.id, new.name, new.vendor_id, new.description, new.long_description);
+    END""",
+    "INSERT INTO tea_teas_fts(tea_teas_fts) VALUES ('rebuild')"
+]
+
+SQLITE_ROLLBACK = [
+    "DROP TRIGGER IF EXISTS tea_teas_fts_update",
+    "DROP TRIGGER IF EXISTS tea_teas_fts_delete",
+    "DROP TRIGGER IF EXISTS tea_teas_fts_insert",
+    "DROP TABLE IF EXISTS tea_teas_fts"
+]
+
+# The combined index filters the teas; the per-column ones weight the relevance.
+MYSQL_MIGRATE = [
+    "ALTER TABLE tea_teas ADD FULLTEXT INDEX tea_teas_fulltext (name, vendor_id, description, long_description)",
+    "ALTER TABLE tea_teas ADD FULLTEXT INDEX tea_teas_fulltext_name (name)",
+    "ALTER TABLE tea_teas ADD FULLTEXT INDEX tea_teas_fulltext_description (description)",
+    "ALTER TABLE tea_teas ADD FULLTEXT INDEX tea_teas_fulltext_long_description (long_description)"
+]
+
+MYSQL_ROLLBACK = [
+    "ALTER TABLE tea_teas DROP INDEX tea_teas_fulltext_long_description",
+    "ALTER TABLE tea_teas DROP INDEX tea_teas_fulltext_description",
+    "ALTER TABLE tea_teas DROP INDEX tea_teas_fulltext_name",
+    "ALTER TABLE tea_teas DROP INDEX tea_teas_fulltext"
+]
+
+
+def migrate(migrator, database, fake=False, **kwargs):
+    """Write your migrations here."""
+
+    # The database may be a proxy (see Flask-PW)
+    database = getattr(database, 'obj', database)
+
+    if isinstance(database, pw.SqliteDatabase):
+        statements = SQLITE_MIGRATE
+    elif isinstance(database, pw.MySQLDatabase):
+        statements = MYSQL_MIGRATE
+    else:
+        return
+
+    for statement in statements:
+        migrator.sql(statement)
+
+
+def rollback(migrator, database, fake=False, **kwargs):
+    """Write your rollback migrations here."""
+
+    database = getattr(database, 'obj', database)
+
+    if isinstance(database, pw.SqliteDatabase):
+        statements = SQLITE_ROLLBACK
+    elif isinstance(database, pw.MySQLDatabase):
+        statements = MYSQL_ROLLBACK
+    else:
+        return
+
+    for statement in statements:
+        migrator.sql(statement)
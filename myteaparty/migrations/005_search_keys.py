@@ -0,0 +1,59 @@
+"""Peewee migrations -- 005_search_keys.py.
+
+Some examples (model - class or model name)::
+
+    > Model = migrator.orm['model_name']            # Return model in current state by name
+
+    > migrator.sql(sql)                             # Run custom SQL
+    > migrator.python(func, *args, **kwargs)        # Run python code
+    > migrator.create_model(Model)                  # Create a model (could be used as decorator)
+    > migrator.remove_model(model, cascade=True)    # Remove a model
+    > migrator.add_fields(model, **fields)          # Add fields to a model
+    > migrator.change_fields(model, **fields)       # Change fields
+    > migrator.remove_fields(model, *field_names, cascade=True)
+    > migrator.rename_field(model, old_field_name, new_field_name)
+    > migrator.rename_table(model, new_table_name)
+    > migrator.add_index(model, *col_names, unique=False)
+    > migrator.drop_index(model, *col_names)
+    > migrator.add_not_null(model, *field_names)
+    > migrator.drop_not_null(model, *field_names)
+    > migrator.add_default(model, field_name, default)
+
+"""
+
+import peewee as pw
+
+from myteaparty.model import Tea
+from myteaparty.search.normalize import search_keys
+
+
+def fill_search_keys():
+    teas = Tea.select(Tea.id, Tea.name, Tea.vendor_internal_id, Tea.description, Tea.long_description)
+
+    for tea in teas:
+        Tea.update(**search_keys({
+            'name': tea.name,
+            'vendor_internal_id': tea.vendor_internal_id,
+            'description': tea.description,
+            'long_description': tea.long_description
+        })).where(Tea.id == tea.id).execute()
+
+
+def migrate(migrator, database, fake=False, **kwargs):
+    """Write your migrations here."""
+    migrator.add_fields(
+        Tea,
+        search_name=pw.CharField(max_length=255, null=True),
+        search_vendor_code=pw.CharField(max_length=255, null=True),
+        search_description=pw.CharField(max_length=255, null=True),
+        search_long_description=pw.TextField(null=True)
+    )
+
+    if not fake:
+        migrator.python(fill_search_keys)
+
+
+def rollback(migrator, database, fake=False, **kwargs):
+    """Write your rollback migrations here."""
+    migrator.remove_fields(Tea, 'search_name', 'search_vendor_code', 'search_description', 'search_long_description',
+                           cascade=True)
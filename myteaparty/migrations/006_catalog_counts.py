@@ -0,0 +1,50 @@
+"""Peewee migrations -- 006_catalog_counts.py.
+
+Some examples (model - class or model name)::
+
+    > Model = migrator.orm['model_name']            # Return model in current state by name
+
+    > migrator.sql(sql)                             # Run custom SQL
+    > migrator.python(func, *args, **kwargs)        # Run python code
+    > migrator.create_model(Model)                  # Create a model (could be used as decorator)
+    > migrator.remove_model(model, cascade=True)    # Remove a model
+    > migrator.add_fields(model, **fields)          # Add fields to a model
+    > migrator.change_fields(model, **fields)       # Change fields
+    > migrator.remove_fields(model, *field_names, cascade=True)
+    > migrator.rename_field(model, old_field_name, new_field_name)
+    > migrator.rename_table(model, new_table_name)
+    > migrator.add_index(model, *col_names, unique=False)
+    > migrator.drop_index(model, *col_names)
+    > migrator.add_not_null(model, *field_names)
+    > migrator.drop_not_null(model, *field_names)
+    > migrator.add_default(model, field_name, default)
+
+"""
+
+import peewee as pw
+
+from myteaparty.catalog import update_catalog_counts
+
+
+def migrate(migrator, database, fake=False, **kwargs):
+    """Write your migrations here."""
+
+    @migrator.create_model
+    class TeaCount(pw.Model):
+        tea_type = pw.ForeignKeyField(db_column='type_id', rel_model=migrator.orm['tea_types'], to_field='id',
+                                      null=True)
+        vendor = pw.ForeignKeyField(db_column='vendor_id', rel_model=migrator.orm['tea_vendors'], to_field='id',
+                                    null=True)
+        count = pw.IntegerField(default=0)
+
+        class Meta:
+            db_table = "tea_counts"
+
+    if not fake:
+        migrator.python(update_catalog_counts)
+
+
+def rollback(migrator, database, fake=False, **kwargs):
+    """Write your rollback migrations here."""
+
+    migrator.remove_model('tea_counts')
@@ -0,0 +1,53 @@
+"""Peewee migrations -- 008_unique_list_items.py.
+
+Some examples (model - class or model name)::
+
+    > Model = migrator.orm['model_name']            # Return model in current state by name
+
+    > migrator.sql(sql)                             # Run custom SQL
+    > migrator.python(func, *args, **kwargs)        # Run python code
+    > migrator.create_model(Model)                  # Create a model (could be used as decorator)
+    > migrator.remove_model(model, cascade=True)    # Remove a model
+    > migrator.add_fields(model, **fields)          # Add fields to a model
+    > migrator.change_fields(model, **fields)       # Change fields
+    > migrator.remove_fields(model, *field_names, cascade=True)
+    > migrator.rename_field(model, old_field_name, new_field_name)
+    > migrator.rename_table(model, new_table_name)
+    > migrator.add_index(model, *col_names, unique=False)
+    > migrator.drop_index(model, *col_names)
+    > migrator.add_not_null(model, *field_names)
+    > migrator.drop_not_null(model, *field_names)
+    > migrator.add_default(model, field_name, default)
+
+"""
+
+
+def remove_duplicate_list_items(database):
+    '''
+    Keeps a single item per tea in each list (the unique index could not be
+    created otherwise). The legacy tables have no id column, so the items of
+    a duplicated tea are all deleted then inserted back once.
+    '''
+    duplicates = database.execute_sql('SELECT list_id, tea_id, MAX(is_empty) FROM tea_lists_items '
+                                      'GROUP BY list_id, tea_id HAVING COUNT(*) > 1').fetchall()
+
+    with database.atomic():
+        for list_id, tea_id, is_empty in duplicates:
+            database.execute_sql('DELETE FROM tea_lists_items WHERE list_id = %s AND tea_id = %s'
+                                 .replace('%s', database.interpolation), (list_id, tea_id))
+            database.execute_sql('INSERT INTO tea_lists_items (list_id, tea_id, is_empty) VALUES (%s, %s, %s)'
+                                 .replace('%s', database.interpolation), (list_id, tea_id, is_empty))
+
+
+def migrate(migrator, database, fake=False, **kwargs):
+    """Write your migrations here."""
+    if not fake:
+        migrator.python(remove_duplicate_list_items, database)
+
+    # The columns names, as peewee_migrate would add _id to the foreign keys
+    migrator.add_index('tea_lists_items', 'list_id', 'tea_id', unique=True)
+
+
+def rollback(migrator, database, fake=False, **kwargs):
+    """Write your rollback migrations here."""
+    migrator.drop_index('tea_lists_items', 'list_id', 'tea_id')
@@ -3,7 +3,7 @@ import datetime
 from flask_pw import Peewee
 from path import Path
 from peewee import Model, CharField, TextField, IntegerField, FloatField, DateTimeField, \
-                   BooleanField, ForeignKeyField, CompositeKey, SqliteDatabase
+                   BooleanField, ForeignKeyField, CompositeKey, SqliteDatabase, MySQLDatabase, IntegrityError
 from playhouse.db_url import connect
 
 from .teaparty import app
@@ -76,6 +76,19 @@ class Tea(BaseModel):
     vendor = ForeignKeyField(db_column='vendor', rel_model=TeaVendor, to_field='id')
     vendor_internal_id = CharField(null=True, db_column='vendor_id')
 
+    # Folded (lowercase, no accents nor HTML) copies of the searched fields,
+    # filled on import. See myteaparty.search.normalize.
+    search_name = CharField(null=True)
+    search_vendor_code = CharField(null=True)
+    search_description = CharField(null=True)
+    search_long_description = TextField(null=True)
+
+    # The brewing tips formatted for display, filled on import. See
+    # myteaparty.tips.
+    tips_short = CharField(null=True)
+    tips_mass_text = CharField(null=True)
+    tips_duration_minutes = IntegerField(null=True)
+
     class Meta:
         db_table = 'tea_teas'
         indexes = (
@@ -101,6 +114,11 @@ class TeaList(BaseModel):
     creator_ip = CharField()
     share_key_valid_until = DateTimeField(null=True)
 
+    # When the list was first used again after its creation (None if never);
+    # the lists never used again are deleted once empty and old enough. See
+    # myteaparty.lists_gc.
+    revisited_at = DateTimeField(null=True)
+
     def __iter__(self):
         '''
         We can iter over a TeaList model object to
@@ -138,6 +156,35 @@ class TeaListItem(BaseModel):
 
     class Meta:
         db_table = 'tea_lists_items'
+        indexes = (
+            (('tea_list', 'tea'), True),  # Trailing comma (tuple)
+        )
+
+
+class CatalogGeneration(BaseModel):
+    '''
+    A single-row table holding a counter increased each time an import
+    commits, so the workers know when their in-memory data is stale.
+    '''
+    generation = IntegerField(default=0)
+    updated = DateTimeField(default=datetime.datetime.now)
+
+    class Meta:
+        db_table = 'tea_catalog_generation'
+
+
+class TeaCount(BaseModel):
+    '''
+    The amount of (non-deleted) teas per type, per vendor, and per type and
+    vendor; a row without type nor vendor holds the total. Recomputed by
+    each import (see myteaparty.catalog.update_catalog_counts).
+    '''
+    tea_type = ForeignKeyField(db_column='type_id', rel_model=TeaType, to_field='id', null=True)
+    vendor = ForeignKeyField(db_column='vendor_id', rel_model=TeaVendor, to_field='id', null=True)
+    count = IntegerField(default=0)
+
+    class Meta:
+        db_table = 'tea_counts'
 
 
 def init_db():
@@ -145,7 +192,8 @@ def init_db():
     Utility to initialize an empty database, meant to be used from
     Flask shell.
     """
-    database.create_tables([TeaVendor, TeaType, Tea, TypeOfATea, TeaList, TeaListItem])
+    database.create_tables([TeaVendor, TeaType, Tea, TypeOfATea, TeaList, TeaListItem, CatalogGeneration,
+                           TeaCount])
 
 
 def get_or_create(Model, **kwargs):
@@ -180,3 +228,27 @@ def get_or_create(Model, **kwargs):
                 return query.get(), False
             except Model.DoesNotExist:
                 raise exc
+
+
+def insert_or_ignore(query):
+    '''
+    Executes a single row insert query in a single statement, skipping the
+    row if it would break a unique index (INSERT IGNORE with MySQL, INSERT OR
+    IGNORE with SQLite). Returns whether the row was inserted.
+    '''
+    real_database = getattr(database, 'obj', database)
+
+    if isinstance(real_database, (MySQLDatabase, SqliteDatabase)):
+        sql, params = query.sql()
+        ignore = 'INSERT IGNORE INTO' if isinstance(real_database, MySQLDatabase) else 'INSERT OR IGNORE INTO'
+
+        return database.execute_sql(ignore + sql[len('INSERT INTO'):], params).rowcount > 0
+
+    # Other databases: the statement is isolated so a conflict does not
+    # abort the current transaction
+    try:
+        with database.atomic():
+            query.execute()
+        return True
+    except IntegrityError:
+        return False
@@ -21,9 +21,12 @@ CREATE TABLE IF NOT EXISTS `tea_lists` (
   `creator_ip` varchar(64) NOT NULL COMMENT 'The list creator\'s IP address',
   `created_at` timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT 'The list\'s creation date',
   `share_key_valid_until` timestamp COMMENT 'The expiration date of the share key used to enable sync between devices',
+  `revisited_at` timestamp NULL DEFAULT NULL COMMENT 'When the list was first used again after its creation',
   PRIMARY KEY (`id`),
   UNIQUE KEY `share_key` (`share_key`),
-  UNIQUE KEY `cookie_key` (`cookie_key`)
+  UNIQUE KEY `cookie_key` (`cookie_key`),
+  KEY `created_at` (`created_at`),
+  KEY `share_key_valid_until` (`share_key_valid_until`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
 -- --------------------------------------------------------
@@ -36,6 +39,7 @@ CREATE TABLE IF NOT EXISTS `tea_lists_items` (
   `list_id` int(11) NOT NULL,
   `tea_id` int(11) NOT NULL,
   `is_empty` tinyint(1) NOT NULL DEFAULT '0',
+  UNIQUE KEY `list_tea` (`list_id`,`tea_id`),
   KEY `list_id` (`list_id`),
   KEY `tea_id` (`tea_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
@@ -0,0 +1,28 @@
+from .base import SearchBackend, SearchHits  # noqa
+from .fulltext import fulltext_search_backend
+from .index import InvertedIndexSearchBackend
+from .sql import SQLSearchBackend
+from ..teaparty import app
+
+
+search_backends = {
+    'fulltext': fulltext_search_backend,
+    'index': InvertedIndexSearchBackend,
+    'sql': SQLSearchBackend
+}
+
+_search_backend = None
+
+
+def get_search_backend():
+    '''
+    Returns the search backend selected by the SEARCH_BACKEND option.
+    The instance is shared by the whole worker, as backends may keep
+    data in memory.
+    '''
+    global _search_backend
+
+    if _search_backend is None:
+        _search_backend = search_backends[app.config['SEARCH_BACKEND']]()
+
+    return _search_backend
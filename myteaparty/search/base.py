@@ -0,0 +1,102 @@
+import bisect
+import math
+
+from ..snapshot import get_catalog_snapshot
+
+
+# The fields of the teas given in the search results
+RESULT_FIELDS = ('id', 'name', 'slug', 'description', 'illustration', 'tips_raw', 'tips_mass', 'tips_volume',
+                 'tips_duration', 'tips_temperature', 'tips_mass_text', 'tips_duration_minutes', 'vendor_name',
+                 'vendor_slug')
+
+
+class SearchBackend(object):
+    '''
+    A way to find teas from keywords. The backend in use is selected
+    by the SEARCH_BACKEND option.
+    '''
+
+    def refresh(self):
+        """
+        Loads (or reloads) the data this backend keeps in memory, if any.
+        Called before the first request of each worker.
+        """
+        pass
+
+    def find(self, search_terms):
+        """
+        Finds the teas matching all the given terms, ranked according to
+        the SEARCH_WEIGHTS option.
+
+        :param search_terms: A list of folded words (see normalize.fold),
+                             all of them having to match.
+        :return: A list of (tea ID, relevance) tuples, most relevant first,
+                 ties being ordered by ID.
+        """
+        raise NotImplementedError()
+
+    def load_results(self, hits):
+        """
+        Loads the given hits from the catalog snapshot, keeping their order.
+
+        :param hits: A list of (tea ID, relevance) tuples.
+        :return: A list of dicts, with the RESULT_FIELDS, the relevance, and
+                 the search_token of each hit.
+        """
+        teas = get_catalog_snapshot().teas_by_id
+        results = []
+
+        for tea_id, relevance in hits:
+            # A tea may have been removed since the hits were computed
+            tea = teas.get(tea_id)
+            if tea is None:
+                continue
+
+            result = {field: getattr(tea, field) for field in RESULT_FIELDS}
+            result.update(relevance=relevance, search_token=SearchHits.make_token(tea_id, relevance))
+            results.append(result)
+
+        return results
+
+
+class SearchHits(object):
+    '''
+    All the teas found by a search, as (tea ID, relevance) tuples, most
+    relevant first. This is what is cached, so the count and any page
+    are taken from it without searching again.
+
+    Besides offsets, pages can start after a token identifying the last
+    result of the previous page (keyset pagination).
+    '''
+
+    def __init__(self, hits):
+        self.hits = [(tea_id, float(relevance)) for tea_id, relevance in hits]
+        self._keys = [(-relevance, tea_id) for tea_id, relevance in self.hits]
+
+    def __len__(self):
+        return len(self.hits)
+
+    def page(self, limit=None, offset=0):
+        return self.hits[offset:offset + limit] if limit is not None else self.hits[offset:]
+
+    def offset_after(self, token):
+        '''
+        Returns the offset of the first hit ranked after the one the given
+        token was made from, or None if the token is invalid or no hit is
+        ranked after it.
+        '''
+        try:
+            relevance, tea_id = token.rsplit('_', 1)
+            key = (-float(relevance), int(tea_id))
+        except (AttributeError, ValueError):
+            return None
+
+        if not math.isfinite(key[0]):
+            return None
+
+        offset = bisect.bisect_right(self._keys, key)
+        return offset if offset < len(self._keys) else None
+
+    @staticmethod
+    def make_token(tea_id, relevance):
+        return f'{relevance!r}_{tea_id}'
@@ -0,0 +1,89 @@
+import re
+
+from peewee import MySQLDatabase, SqliteDatabase
+
+from .base import SearchBackend
+from ..model import database
+from ..teaparty import app
+
+
+class SQLiteFullTextSearchBackend(SearchBackend):
+    '''
+    Searches using the tea_teas_fts FTS5 table, kept in sync with the teas
+    table by triggers (see the 004_fulltext_search migration). Results are
+    ranked using bm25, with the SEARCH_WEIGHTS as columns weights.
+    '''
+
+    _word = re.compile(r'\w')
+
+    def find(self, search_terms):
+        search_terms = [term for term in search_terms if self._word.search(term)]
+        if not search_terms:
+            return []
+
+        # Each term is quoted (so it cannot be read as an FTS operator) and
+        # matched as a prefix
+        match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in search_terms)
+        weights = app.config['SEARCH_WEIGHTS']
+
+        # bm25 is negative, the lowest being the most relevant
+        return database.execute_sql(
+            'SELECT rowid, -bm25(tea_teas_fts, ?, ?, ?, ?) AS relevance '
+            'FROM tea_teas_fts WHERE tea_teas_fts MATCH ? '
+            'ORDER BY relevance DESC, rowid',
+            (weights['name'], weights['vendor_code'], weights['desc'], weights['ldesc'], match)
+        ).fetchall()
+
+
+class MySQLFullTextSearchBackend(SearchBackend):
+    '''
+    Searches using the FULLTEXT indexes of the teas table (see the
+    004_fulltext_search migration). A combined index filters the teas, and
+    the per-column ones are used to weight the relevance according to the
+    SEARCH_WEIGHTS.
+    '''
+
+    _boolean_operators = re.compile(r'[+\-<>()~*"@]+')
+
+    def find(self, search_terms):
+        search_terms = [term for term in (self._boolean_operators.sub(' ', term).strip() for term in search_terms)
+                        if term]
+        if not search_terms:
+            return []
+
+        # Every term must match, as a prefix
+        against = ' '.join('+{}*'.format(term) if ' ' not in term else '+"{}"'.format(term)
+                           for term in search_terms)
+        weights = app.config['SEARCH_WEIGHTS']
+
+        vendor_codes = ', '.join(['%s'] * len(search_terms))
+
+        return database.execute_sql(
+            'SELECT id, ('
+            '    MATCH(name) AGAINST(%s IN BOOLEAN MODE) * %s'
+            f'   + IF(search_vendor_code IN ({vendor_codes}), %s, 0)'
+            '    + MATCH(description) AGAINST(%s IN BOOLEAN MODE) * %s'
+            '    + MATCH(long_description) AGAINST(%s IN BOOLEAN MODE) * %s'
+            ') AS relevance '
+            'FROM tea_teas '
+            'WHERE MATCH(name, vendor_id, description, long_description) AGAINST(%s IN BOOLEAN MODE) '
+            'ORDER BY relevance DESC, id',
+            (against, weights['name'],
+             *search_terms, weights['vendor_code'],
+             against, weights['desc'],
+             against, weights['ldesc'],
+             against)
+        ).fetchall()
+
+
+def fulltext_search_backend():
+    '''
+    Returns the full-text search backend matching the database in use.
+    '''
+    # The database is a proxy (see Flask-PW)
+    if isinstance(database.obj, SqliteDatabase):
+        return SQLiteFullTextSearchBackend()
+    elif isinstance(database.obj, MySQLDatabase):
+        return MySQLFullTextSearchBackend()
+
+    raise ValueError('The fulltext search backend is only available with SQLite and MySQL.')
@@ -0,0 +1,127 @@
+import bisect
+
+from .base import SearchBackend
+from .normalize import tokenize
+from ..catalog import CatalogDependentValue
+from ..model import Tea
+from ..teaparty import app
+
+
+# The fields a token can be found in, as bits of the postings values
+FIELD_NAME = 1
+FIELD_VENDOR_CODE = 2
+FIELD_DESC = 4
+FIELD_LDESC = 8
+
+_fields_weights_keys = {
+    FIELD_NAME: 'name',
+    FIELD_VENDOR_CODE: 'vendor_code',
+    FIELD_DESC: 'desc',
+    FIELD_LDESC: 'ldesc'
+}
+
+
+class InvertedIndex(object):
+    '''
+    An inverted index of the teas: for each token, the teas containing
+    it, with the fields it was found in (as a bit mask).
+    '''
+
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []
+        self.vendor_codes = {}
+
+    @classmethod
+    def build(cls):
+        '''
+        Builds the index from the search keys of the whole teas table.
+        '''
+        index = cls()
+
+        teas = (Tea.select(Tea.id, Tea.search_name, Tea.search_vendor_code, Tea.search_description,
+                           Tea.search_long_description)
+                   .tuples())
+
+        for tea_id, name, vendor_code, description, long_description in teas:
+            for field, text in ((FIELD_NAME, name), (FIELD_DESC, description), (FIELD_LDESC, long_description)):
+                for token in tokenize(text):
+                    tea_postings = index.postings.setdefault(token, {})
+                    tea_postings[tea_id] = tea_postings.get(tea_id, 0) | field
+
+            if vendor_code:
+                index.vendor_codes.setdefault(vendor_code, set()).add(tea_id)
+
+        index.vocabulary = sorted(index.postings)
+
+        return index
+
+    def _fields_matching(self, word):
+        '''
+        Returns a dict associating each tea having a token starting with the
+        given word to the fields where such tokens were found.
+        '''
+        fields = {}
+
+        start = bisect.bisect_left(self.vocabulary, word)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(word):
+                break
+            for tea_id, token_fields in self.postings[token].items():
+                fields[tea_id] = fields.get(tea_id, 0) | token_fields
+
+        return fields
+
+    def search(self, search_terms, weights):
+        '''
+        Returns a list of (tea ID, relevance) tuples for the teas matching
+        all the search terms, most relevant first.
+
+        weights: a dict associating each field bit to its weight.
+        '''
+        masks_weights = [sum(weight for field, weight in weights.items() if mask & field) for mask in range(16)]
+        scores = None
+
+        for term in search_terms:
+            term_fields = None
+
+            for word in tokenize(term):
+                word_fields = self._fields_matching(word)
+                if term_fields is None:
+                    term_fields = word_fields
+                else:
+                    term_fields = {tea_id: fields | word_fields[tea_id]
+                                   for tea_id, fields in term_fields.items() if tea_id in word_fields}
+
+            term_fields = term_fields or {}
+            for tea_id in self.vendor_codes.get(term, ()):
+                term_fields[tea_id] = term_fields.get(tea_id, 0) | FIELD_VENDOR_CODE
+
+            if scores is None:
+                scores = {tea_id: masks_weights[fields] for tea_id, fields in term_fields.items()}
+            else:
+                scores = {tea_id: score + masks_weights[term_fields[tea_id]]
+                          for tea_id, score in scores.items() if tea_id in term_fields}
+
+            if not scores:
+                return []
+
+        return sorted((scores or {}).items(), key=lambda hit: (-hit[1], hit[0]))
+
+
+class InvertedIndexSearchBackend(SearchBackend):
+    '''
+    Searches using an inverted index kept in memory, built from the teas
+    table and rebuilt when the catalog generation changes (i.e. after an
+    import).
+    '''
+
+    def __init__(self):
+        self._index = CatalogDependentValue(InvertedIndex.build)
+
+    def refresh(self):
+        self._index.get()
+
+    def find(self, search_terms):
+        weights = {field: app.config['SEARCH_WEIGHTS'][key] for field, key in _fields_weights_keys.items()}
+        return self._index.get().search(search_terms, weights)
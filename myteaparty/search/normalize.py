@@ -0,0 +1,63 @@
+import html
+import re
+import unicodedata
+
+from ..model import Tea
+
+_html_tags = re.compile(r'<[^>]+>')
+_words = re.compile(r'\w+')
+_ligatures = str.maketrans({'œ': 'oe', 'æ': 'ae', 'ß': 'ss'})
+
+# The searched Tea fields, and the field storing the folded version of each
+search_keys_fields = {
+    'name': 'search_name',
+    'vendor_internal_id': 'search_vendor_code',
+    'description': 'search_description',
+    'long_description': 'search_long_description'
+}
+
+
+def fold(text):
+    '''
+    Returns the given text lowercased, without accents, HTML tags nor
+    entities, and with whitespaces collapsed. This is how texts are
+    compared when searching.
+    '''
+    if not text:
+        return ''
+
+    text = html.unescape(_html_tags.sub(' ', text)).lower().translate(_ligatures)
+    text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+    return ' '.join(text.split())
+
+
+def tokenize(text):
+    '''
+    Splits a folded text into words.
+    '''
+    if not text:
+        return []
+
+    return _words.findall(text)
+
+
+def search_keys(data):
+    '''
+    Returns the search keys to store along a tea: a dict with the folded
+    version of each searched field present in data (a dict of Tea fields).
+    Searches compare against them, so texts are folded once when imported
+    instead of on each search.
+
+    Folding may lengthen a text (ligatures, compatibility characters), so
+    the keys are truncated to their column's length.
+    '''
+    keys = {}
+    for field, key in search_keys_fields.items():
+        if field in data:
+            keys[key] = fold(str(data[field])) if data[field] is not None else None
+            max_length = getattr(getattr(Tea, key), 'max_length', None)
+            if keys[key] and max_length:
+                keys[key] = keys[key][:max_length]
+
+    return keys
@@ -0,0 +1,36 @@
+from peewee import SQL
+from playhouse.shortcuts import case
+
+from .base import SearchBackend
+from ..model import Tea
+from ..teaparty import app
+
+
+class SQLSearchBackend(SearchBackend):
+    '''
+    Searches using plain SQL, scanning the search keys of the teas table
+    on each search. Works with any database.
+    '''
+
+    def find(self, search_terms):
+        weights = app.config['SEARCH_WEIGHTS']
+
+        relevance = SQL('0')
+        where_clause = SQL('1')
+        for word in search_terms:
+            relevance += (case(None, [(Tea.search_name.contains(word), weights['name'])], 0) +
+                          case(None, [(Tea.search_vendor_code == word, weights['vendor_code'])], 0) +
+                          case(None, [(Tea.search_description.contains(word), weights['desc'])], 0) +
+                          case(None, [(Tea.search_long_description.contains(word), weights['ldesc'])], 0))
+            where_clause &= ((Tea.search_name.contains(word)) |
+                             (Tea.search_vendor_code == word) |
+                             (Tea.search_description.contains(word)) |
+                             (Tea.search_long_description.contains(word)))
+
+        # Filtered in WHERE: HAVING without GROUP BY is refused by SQLite
+        teas = (Tea.select(Tea.id, relevance.alias('relevance'))
+                   .where(where_clause & (relevance != 0))
+                   .order_by(SQL('relevance DESC'), Tea.id)
+                   .tuples())
+
+        return list(teas)
@@ -0,0 +1,122 @@
+import bisect
+
+from .normalize import fold
+from ..catalog import CatalogDependentValue
+from ..model import Tea, TeaType, TeaVendor
+
+
+# The kinds of suggestions, in the order they are displayed for equally good matches
+SUGGESTION_TEA = 'tea'
+SUGGESTION_VENDOR = 'vendor'
+SUGGESTION_TYPE = 'type'
+
+_kinds_order = {SUGGESTION_TEA: 0, SUGGESTION_VENDOR: 1, SUGGESTION_TYPE: 2}
+
+
+class Suggestion(object):
+    __slots__ = ('kind', 'name', 'slug', 'vendor_slug', 'vendor_name')
+
+    def __init__(self, kind, name, slug, vendor_slug=None, vendor_name=None):
+        self.kind = kind
+        self.name = name
+        self.slug = slug
+        self.vendor_slug = vendor_slug
+        self.vendor_name = vendor_name
+
+
+class SuggestionsIndex(object):
+    '''
+    A sorted array of keys, searched by bisection to find the names starting
+    with a prefix. Each name is indexed from each of its words, so "polo"
+    suggests "Marco Polo".
+    '''
+
+    # Maximal amount of keys looked at for a single prefix, so a one-letter
+    # prefix costs the same as a long one
+    MAX_SCANNED_KEYS = 200
+
+    def __init__(self):
+        self.keys = []
+        self.positions = []
+        self.suggestions = []
+
+    @classmethod
+    def build(cls):
+        '''
+        Builds the index from the (non-deleted) teas, the vendors and the types.
+        '''
+        index = cls()
+        entries = []
+
+        teas = (Tea.select(Tea.name, Tea.slug, TeaVendor.slug, TeaVendor.name)
+                   .join(TeaVendor)
+                   .where(Tea.deleted.is_null())
+                   .tuples())
+
+        for name, slug, vendor_slug, vendor_name in teas:
+            entries.append(Suggestion(SUGGESTION_TEA, name, slug, vendor_slug, vendor_name))
+
+        for name, slug in TeaVendor.select(TeaVendor.name, TeaVendor.slug).tuples():
+            entries.append(Suggestion(SUGGESTION_VENDOR, name, slug))
+
+        for name, slug in TeaType.select(TeaType.name, TeaType.slug).tuples():
+            entries.append(Suggestion(SUGGESTION_TYPE, name, slug))
+
+        keys = []
+        for position, suggestion in enumerate(entries):
+            words = fold(suggestion.name).split()
+            for i in range(len(words)):
+                keys.append((' '.join(words[i:]), i, position))
+
+        keys.sort()
+
+        index.keys = [key for key, _, _ in keys]
+        index.positions = [(word_index, position) for _, word_index, position in keys]
+        index.suggestions = entries
+
+        return index
+
+    def suggest(self, prefix, limit):
+        '''
+        Returns up to limit suggestions whose name has a word starting with
+        the given prefix. Names starting with it come first, then the
+        shortest ones.
+        '''
+        prefix = fold(prefix)
+        if not prefix:
+            return []
+
+        start = bisect.bisect_left(self.keys, prefix)
+        found = {}
+
+        for key, (word_index, position) in zip(self.keys[start:start + self.MAX_SCANNED_KEYS],
+                                               self.positions[start:start + self.MAX_SCANNED_KEYS]):
+            if not key.startswith(prefix):
+                break
+            if position not in found or word_index < found[position]:
+                found[position] = word_index
+
+        ranked = sorted(found.items(), key=lambda match: (match[1] > 0,
+                                                          _kinds_order[self.suggestions[match[0]].kind],
+                                                          len(self.suggestions[match[0]].name),
+                                                          match[0]))
+
+        return [self.suggestions[position] for position, _ in ranked[:limit]]
+
+
+_suggestions_index = CatalogDependentValue(SuggestionsIndex.build)
+
+
+def get_suggestions_index():
+    '''
+    Returns the suggestions index of this worker, rebuilt when the catalog
+    generation changes.
+    '''
+    return _suggestions_index.get()
+
+
+def get_suggestions(prefix, limit):
+    '''
+    Returns up to limit suggestions for the given search prefix.
+    '''
+    return get_suggestions_index().suggest(prefix, limit)
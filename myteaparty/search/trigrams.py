@@ -0,0 +1,97 @@
+import heapq
+
+from collections import Counter
+
+from .normalize import tokenize
+from ..catalog import CatalogDependentValue
+from ..model import Tea
+
+
+def trigrams(text):
+    '''
+    Returns the set of trigrams of the words of the given folded text. Words are
+    padded, so their beginning weights more than their end.
+    '''
+    grams = set()
+
+    for word in tokenize(text):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    return grams
+
+
+class TrigramIndex(object):
+    '''
+    An index of the trigrams of the teas names and vendor codes, to find
+    teas with a name similar to a misspelled query.
+    '''
+
+    # Longer queries are truncated, so a search costs at most a few dozen
+    # postings lookups
+    MAX_QUERY_LENGTH = 64
+
+    def __init__(self):
+        self.postings = {}
+        self.sizes = {}
+
+    @classmethod
+    def build(cls):
+        index = cls()
+
+        for tea_id, name, vendor_code in Tea.select(Tea.id, Tea.search_name, Tea.search_vendor_code).tuples():
+            grams = trigrams(name) | trigrams(vendor_code)
+            index.sizes[tea_id] = len(grams)
+
+            for gram in grams:
+                index.postings.setdefault(gram, []).append(tea_id)
+
+        return index
+
+    def find(self, search_query, min_similarity, limit):
+        '''
+        Returns up to limit (tea ID, relevance) tuples, most relevant first,
+        for the teas sharing at least min_similarity (from 0 to 1) of the
+        query trigrams.
+
+        The relevance also accounts for the trigrams of the tea not in the
+        query, so among equally matching teas, the closest names come first.
+        '''
+        query_grams = trigrams(search_query[:self.MAX_QUERY_LENGTH])
+        if not query_grams:
+            return []
+
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+
+        hits = []
+        for tea_id, shared_count in shared.items():
+            if shared_count / len(query_grams) < min_similarity:
+                continue
+
+            relevance = 100 * (shared_count / len(query_grams)
+                               + 2 * shared_count / (len(query_grams) + self.sizes[tea_id])) / 2
+            hits.append((tea_id, relevance))
+
+        return heapq.nsmallest(limit, hits, key=lambda hit: (-hit[1], hit[0]))
+
+
+_trigram_index = CatalogDependentValue(TrigramIndex.build)
+
+
+def get_trigram_index():
+    '''
+    Returns the trigram index of this worker, rebuilt when the catalog
+    generation changes.
+    '''
+    return _trigram_index.get()
+
+
+def find_similar_teas(search_query, min_similarity, limit):
+    '''
+    Returns (tea ID, relevance) tuples for the teas whose name or vendor code
+    looks like the query, most relevant first. Used when a search finds
+    nothing, to tolerate typos.
+    '''
+    return get_trigram_index().find(search_query, min_similarity, limit)
@@ -0,0 +1,233 @@
+import bisect
+
+from .catalog import CatalogCounts, CatalogDependentValue
+from .model import database, Tea, TeaVendor, TeaType, TypeOfATea
+
+
+class _Record(object):
+    '''
+    A read-only record of the catalog snapshot.
+    '''
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is read-only')
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.id}>'
+
+    def as_tuple(self):
+        '''
+        Returns the values of the record, the records it references included,
+        as nested tuples.
+        '''
+        def value(item):
+            if isinstance(item, _Record):
+                return item.as_tuple()
+            if isinstance(item, tuple):
+                return tuple(value(sub_item) for sub_item in item)
+            return item
+
+        return tuple(value(getattr(self, name)) for name in self.__slots__)
+
+
+class VendorRecord(_Record):
+    __slots__ = ('id', 'name', 'slug', 'description', 'link', 'logo', 'twitter', 'order')
+
+
+class TypeRecord(_Record):
+    __slots__ = ('id', 'name', 'slug', 'is_origin', 'order')
+
+
+class TeaRecord(_Record):
+    __slots__ = ('id', 'name', 'slug', 'description', 'long_description', 'illustration', 'link', 'price',
+                 'price_unit', 'tips_raw', 'tips_duration', 'tips_mass', 'tips_temperature', 'tips_volume',
+                 'tips_extra', 'tips_max_brews', 'tips_short', 'tips_mass_text', 'tips_duration_minutes', 'updated',
+                 'deleted', 'vendor_internal_id', 'vendor', 'types')
+
+    @property
+    def vendor_slug(self):
+        return self.vendor.slug
+
+    @property
+    def vendor_name(self):
+        return self.vendor.name
+
+    @property
+    def changed(self):
+        '''
+        When the tea was last updated or deleted.
+        '''
+        return max(self.updated, self.deleted) if self.deleted is not None else self.updated
+
+    @property
+    def listing_key(self):
+        '''
+        The key the listings are sorted by.
+        '''
+        return self.vendor.order, self.name, self.id
+
+
+class TeasListing(object):
+    '''
+    A sorted list of teas, with their listing keys.
+    '''
+    __slots__ = ('teas', 'keys')
+
+    def __init__(self, teas):
+        self.teas = tuple(sorted(teas, key=lambda tea: tea.listing_key))
+        self.keys = tuple(tea.listing_key for tea in self.teas)
+
+    def __len__(self):
+        return len(self.teas)
+
+    def index_after(self, key):
+        '''
+        Returns the index of the first tea after the given listing key.
+        '''
+        return bisect.bisect_right(self.keys, key)
+
+
+def _order_key(order):
+    # Like in SQL, the types without order come first
+    return (order is not None, order or 0)
+
+
+class CatalogSnapshot(object):
+    '''
+    A read-only copy of the catalog (vendors, types and teas), kept in
+    memory by each worker and replaced as a whole after each import.
+
+    All the teas are indexed (the deleted ones are kept as archives), but
+    the listings only contain the others, in the same order as the catalog
+    pages.
+    '''
+
+    def __init__(self):
+        self.vendors = ()
+        self.types = ()
+        self.teas_by_id = {}
+        self.counts = CatalogCounts()
+
+        self._vendors_by_slug = {}
+        self._types_by_slug = {}
+        self._teas_by_slugs = {}
+        self._all_teas = TeasListing([])
+        self._teas_by_type = {}
+        self._teas_by_vendor = {}
+        self._teas_by_change = ()
+        self._changes_keys = ()
+
+    @classmethod
+    def build(cls):
+        '''
+        Loads the snapshot from the database, in a single transaction so the
+        data is consistent even if an import commits meanwhile.
+        '''
+        snapshot = cls()
+        fields = [name for name in TeaRecord.__slots__ if name not in ('vendor', 'types')]
+
+        with database.atomic():
+            vendors = [VendorRecord(**vendor) for vendor in TeaVendor.select().dicts()]
+            types = [TypeRecord(**tea_type) for tea_type in TeaType.select().dicts()]
+            types_links = list(TypeOfATea.select(TypeOfATea.tea, TypeOfATea.tea_type).tuples())
+            teas = list(Tea.select(*[getattr(Tea, name) for name in fields], Tea.vendor).tuples())
+            counts = CatalogCounts.load()
+
+        snapshot.vendors = tuple(sorted(vendors, key=lambda vendor: (vendor.order, vendor.id)))
+        snapshot.types = tuple(sorted(types, key=lambda tea_type: (_order_key(tea_type.order), tea_type.id)))
+        snapshot.counts = counts
+
+        vendors_by_id = {vendor.id: vendor for vendor in vendors}
+        types_by_id = {tea_type.id: tea_type for tea_type in types}
+
+        teas_types = {}
+        for tea_id, tea_type_id in types_links:
+            if tea_type_id in types_by_id:
+                teas_types.setdefault(tea_id, set()).add(types_by_id[tea_type_id])
+
+        for row in teas:
+            values = dict(zip(fields, row))
+            tea_types = sorted(teas_types.get(values['id'], ()),
+                               key=lambda tea_type: (tea_type.is_origin, _order_key(tea_type.order), tea_type.id))
+
+            tea = TeaRecord(vendor=vendors_by_id[row[-1]], types=tuple(tea_types), **values)
+            snapshot.teas_by_id[tea.id] = tea
+
+        snapshot._vendors_by_slug = {vendor.slug: vendor for vendor in vendors}
+        snapshot._types_by_slug = {tea_type.slug: tea_type for tea_type in types}
+        snapshot._teas_by_slugs = {(tea.vendor.slug, tea.slug): tea for tea in snapshot.teas_by_id.values()}
+
+        listed = [tea for tea in snapshot.teas_by_id.values() if tea.deleted is None]
+        teas_by_type = {}
+        teas_by_vendor = {}
+
+        for tea in listed:
+            teas_by_vendor.setdefault(tea.vendor.id, []).append(tea)
+            for tea_type in tea.types:
+                teas_by_type.setdefault(tea_type.id, []).append(tea)
+
+        snapshot._all_teas = TeasListing(listed)
+        snapshot._teas_by_type = {type_id: TeasListing(teas) for type_id, teas in teas_by_type.items()}
+        snapshot._teas_by_vendor = {vendor_id: TeasListing(teas) for vendor_id, teas in teas_by_vendor.items()}
+
+        snapshot._teas_by_change = tuple(sorted(snapshot.teas_by_id.values(), key=lambda tea: (tea.changed, tea.id)))
+        snapshot._changes_keys = tuple((tea.changed, tea.id) for tea in snapshot._teas_by_change)
+
+        return snapshot
+
+    def get_vendor(self, slug):
+        return self._vendors_by_slug.get(slug)
+
+    def get_type(self, slug):
+        return self._types_by_slug.get(slug)
+
+    def get_tea(self, vendor_slug, tea_slug):
+        return self._teas_by_slugs.get((vendor_slug, tea_slug))
+
+    def get_types(self, is_origin):
+        return [tea_type for tea_type in self.types if tea_type.is_origin == is_origin]
+
+    def get_listing(self, tea_type=None, vendor=None):
+        '''
+        Returns the (non-deleted) teas of the given type or vendor, or all of
+        them, as a TeasListing.
+        '''
+        if tea_type is not None:
+            return self._teas_by_type.get(tea_type.id, TeasListing([]))
+        if vendor is not None:
+            return self._teas_by_vendor.get(vendor.id, TeasListing([]))
+
+        return self._all_teas
+
+    def iter_changes(self, since=None):
+        '''
+        Iterates over all the teas (the deleted ones included), ordered by
+        when they last changed (see TeaRecord.changed) then id, starting from
+        the given datetime if any.
+        '''
+        start = bisect.bisect_left(self._changes_keys, (since,)) if since is not None else 0
+        for index in range(start, len(self._teas_by_change)):
+            yield self._teas_by_change[index]
+
+
+_catalog_snapshot = CatalogDependentValue(CatalogSnapshot.build)
+
+
+def get_catalog_snapshot():
+    '''
+    Returns the catalog snapshot of this worker, rebuilt when the catalog
+    generation changes.
+    '''
+    return _catalog_snapshot.get()
+
+
+def get_vendors():
+    '''
+    Returns the vendors, ordered, from the catalog snapshot.
+    '''
+    return get_catalog_snapshot().vendors
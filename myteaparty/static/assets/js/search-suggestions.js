@@ -0,0 +1,108 @@
+(function()
+{
+    'use strict';
+
+    var search_input = document.getElementById('search_tea');
+    if (!search_input) return;
+
+    var suggestions_container = document.createElement('div');
+    var suggestions_content = document.createElement('div');
+    var suggestions_menu = document.createElement('div');
+
+    suggestions_container.className = 'dropdown search-suggestions';
+    suggestions_container.style.display = 'block';
+    suggestions_menu.className = 'dropdown-menu';
+    suggestions_menu.style.width = '100%';
+    suggestions_content.className = 'dropdown-content';
+
+    suggestions_menu.appendChild(suggestions_content);
+    suggestions_container.appendChild(suggestions_menu);
+    search_input.parentNode.parentNode.appendChild(suggestions_container);
+
+    var timeout_id = null;
+    var last_query = null;
+
+    var hide_suggestions = function()
+    {
+        suggestions_container.classList.remove('is-active');
+    };
+
+    var display_suggestions = function(suggestions)
+    {
+        while (suggestions_content.firstChild)
+        {
+            suggestions_content.removeChild(suggestions_content.firstChild);
+        }
+
+        if (!suggestions.length)
+        {
+            hide_suggestions();
+            return;
+        }
+
+        for (var i = 0; i < suggestions.length; i++)
+        {
+            var link = document.createElement('a');
+            link.className = 'dropdown-item';
+            link.href = suggestions[i].url;
+            link.textContent = suggestions[i].label;
+
+            suggestions_content.appendChild(link);
+        }
+
+        suggestions_container.classList.add('is-active');
+    };
+
+    search_input.setAttribute('autocomplete', 'off');
+
+    search_input.addEventListener('input', function()
+    {
+        var query = search_input.value.trim();
+
+        if (timeout_id) clearTimeout(timeout_id);
+
+        if (!query)
+        {
+            last_query = null;
+            hide_suggestions();
+            return;
+        }
+
+        timeout_id = setTimeout(function()
+        {
+            last_query = query;
+
+            ajax_json_call(
+                'GET',
+                window.mtp_config['urls']['search_suggest'] + '?q=' + encodeURIComponent(query),
+                function(request, data)
+                {
+                    // An answer to an outdated query
+                    if (query != last_query) return;
+
+                    display_suggestions(data.suggestions);
+                },
+                function(request, is_connection_error)
+                {
+                    hide_suggestions();
+                }
+            );
+        }, 120);
+    });
+
+    search_input.addEventListener('keydown', function(e)
+    {
+        if (e.key == 'Escape' || e.keyCode == 27)
+        {
+            hide_suggestions();
+        }
+    });
+
+    document.addEventListener('click', function(e)
+    {
+        if (!suggestions_container.contains(e.target) && e.target != search_input)
+        {
+            hide_suggestions();
+        }
+    });
+})();
@@ -21,56 +21,130 @@
         };
     }
 
-    var tea_lists_togglers = document.querySelectorAll('.toggle-list-link');
-
-    for (var i = tea_lists_togglers.length - 1; i >= 0; i--)
+    var bind_tea_lists_togglers = function()
     {
-        tea_lists_togglers[i].onclick = function(e)
+        var tea_lists_togglers = document.querySelectorAll('.toggle-list-link');
+
+        for (var i = tea_lists_togglers.length - 1; i >= 0; i--)
         {
-            e.preventDefault();
+            tea_lists_togglers[i].onclick = toggle_tea_in_list;
+        }
+    };
+
+    var toggle_tea_in_list = function(e)
+    {
+        e.preventDefault();
+
+        self = this;
 
-            self = this;
+        var icon = self.querySelectorAll('span.fa')[0];
+        var was_unchecked = icon.classList.contains('list-unchecked');
 
-            var icon = self.querySelectorAll('span.fa')[0];
-            var was_unchecked = icon.classList.contains('list-unchecked');
+        icon.classList.remove('fa-check', 'list-unchecked');
+        icon.classList.add('fa-circle-o-notch', 'fa-spin');
 
-            icon.classList.remove('fa-check', 'list-unchecked');
-            icon.classList.add('fa-circle-o-notch', 'fa-spin');
+        ajax_json_call(
+            'POST',
+            this.href,
+            function(request, data)
+            {
+                icon.classList.remove('fa-circle-o-notch', 'fa-spin');
+                icon.classList.add('fa-check');
 
-            ajax_json_call(
-                'POST',
-                this.href,
-                function(request, data)
+                if (!data.in_list)
                 {
-                    icon.classList.remove('fa-circle-o-notch', 'fa-spin');
+                    icon.classList.add('list-unchecked');
+                }
+            },
+            function(request, is_connection_error)
+            {
+                icon.classList.remove('fa-circle-o-notch', 'fa-spin');
+                icon.classList.add('fa-warning');
+
+                self.classList.add('is-error');
+
+                self.setAttribute('title', 'Impossible d\'ajouter le thé à cette liste.' + (is_connection_error ? ' Il semblerait que vous ne soyez plus connecté à internet.' : ''));
+
+                setTimeout(function() {
+                    self.classList.remove('is-error');
+                    icon.classList.remove('fa-warning');
                     icon.classList.add('fa-check');
 
-                    if (!data.in_list)
+                    if (was_unchecked)
                     {
                         icon.classList.add('list-unchecked');
                     }
-                },
-                function(request, is_connection_error)
+                }, 1500);
+            }
+        );
+    };
+
+    bind_tea_lists_togglers();
+
+    // Pages rendered without the user's lists (e.g. exported as static
+    // files) load them afterwards, if the user has any.
+    var hero = document.getElementById('hero-tea');
+    var user_lists_url = hero.getAttribute('data-user-lists-url');
+
+    if (user_lists_url && (getCookie(mtp_config['cookies']['lists']) || getCookie(mtp_config['cookies']['active_list'])))
+    {
+        ajax_json_call(
+            'GET',
+            user_lists_url,
+            function(request, data)
+            {
+                var tooltip = data.in_favorites ? 'Retirer de mes favoris' : 'Ajouter à mes favoris';
+
+                var favorites_tooltips = document.querySelectorAll('.favorites-tooltip');
+                for (var i = favorites_tooltips.length - 1; i >= 0; i--)
+                {
+                    favorites_tooltips[i].setAttribute('aria-label', tooltip);
+                    if (favorites_tooltips[i].hasAttribute('data-tooltip'))
+                    {
+                        favorites_tooltips[i].setAttribute('data-tooltip', tooltip);
+                    }
+                }
+
+                var favorites_links = document.querySelectorAll('.favorites-link');
+                for (var i = favorites_links.length - 1; i >= 0; i--)
+                {
+                    var icon = favorites_links[i].querySelectorAll('span.fa')[0];
+
+                    favorites_links[i].href = data.favorites_url;
+                    icon.classList.toggle('fa-star', data.in_favorites);
+                    icon.classList.toggle('fa-star-o', !data.in_favorites);
+                }
+
+                if (!data.lists.length) return;
+
+                var entries = document.querySelectorAll('.tea-lists-entries');
+                for (var i = entries.length - 1; i >= 0; i--)
                 {
-                    icon.classList.remove('fa-circle-o-notch', 'fa-spin');
-                    icon.classList.add('fa-warning');
+                    var link_class = entries[i].getAttribute('data-link-class');
+                    var icon_class = entries[i].getAttribute('data-icon-class');
 
-                    self.classList.add('is-error');
+                    entries[i].innerHTML = '';
 
-                    self.setAttribute('title', 'Impossible d\'ajouter le thé à cette liste.' + (is_connection_error ? ' Il semblerait que vous ne soyez plus connecté à internet.' : ''));
+                    data.lists.forEach(function(tea_list)
+                    {
+                        var link = document.createElement('a');
+                        var icon = document.createElement('span');
+
+                        link.href = tea_list.toggle_url;
+                        link.className = link_class + ' toggle-list-link';
 
-                    setTimeout(function() {
-                        self.classList.remove('is-error');
-                        icon.classList.remove('fa-warning');
-                        icon.classList.add('fa-check');
+                        icon.className = (icon_class ? icon_class + ' ' : '') + 'fa fa-check' + (tea_list.in_list ? '' : ' list-unchecked');
+                        icon.setAttribute('aria-hidden', 'true');
 
-                        if (was_unchecked)
-                        {
-                            icon.classList.add('list-unchecked');
-                        }
-                    }, 1500);
+                        link.appendChild(icon);
+                        link.appendChild(document.createTextNode(' ' + tea_list.name));
+                        entries[i].appendChild(link);
+                    });
                 }
-            );
-        };
+
+                bind_tea_lists_togglers();
+            },
+            function(request, is_connection_error) {}
+        );
     }
 })();
@@ -21,6 +21,7 @@ from .views.search import *  # noqa
 from .views.teas import *  # noqa
 from .views.lists import *  # noqa
 from .views.fallbacks import *  # noqa
+from .views.api import *  # noqa
 
 if app.debug:
 	from flask_debugtoolbar import DebugToolbarExtension
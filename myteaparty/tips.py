@@ -0,0 +1,71 @@
+from .model import database, Tea
+
+
+tips_fields = ('tips_mass', 'tips_volume', 'tips_temperature', 'tips_duration')
+
+
+def format_tips_mass(mass):
+    '''
+    Formats a tea mass, as stored: in milligrams, or as a negative amount
+    of tea bags.
+    '''
+    if not mass:
+        return None
+    if mass >= 0:
+        return f'{mass / 1000} g'
+
+    return f'{-mass} sachet{"s" if -mass > 1 else ""}'
+
+
+def format_tips_short(mass, volume, temperature, duration):
+    '''
+    Formats the brewing tips as a short French sentence, e.g. « 2,5g dans
+    20 cL d'eau à 80°C, pendant 3 minutes. » The apostrophe is an HTML
+    entity.
+    '''
+    tips_short = ''
+    if mass:
+        if mass > 0:
+            tips_short += str(mass / 1000).replace('.', ',') + 'g'
+        else:
+            tips_short += str(-int(mass)) + ' sachets'
+    if volume:
+        tips_short += f'{" dans " if mass else ""}{volume} cL'
+    if temperature:
+        tips_short += f'{" d&rsquo;eau à " if tips_short else ""}{temperature}°C'
+    if duration:
+        tips_short += f'{", pendant " if tips_short else ""}{duration // 60} minute{"s" if duration >= 120 else ""}'
+    if tips_short:
+        tips_short += '.'
+
+    return tips_short or None
+
+
+def tips_summary(data):
+    '''
+    Returns the brewing summary to store along a tea: a dict with the short
+    tips sentence, the formatted mass and the duration in minutes, computed
+    from the tips in data (a dict of Tea fields). Pages display them as is,
+    so they are formatted once when imported instead of on each view.
+    '''
+    mass, volume, temperature, duration = (data.get(field) for field in tips_fields)
+
+    return {
+        'tips_short': format_tips_short(mass, volume, temperature, duration),
+        'tips_mass_text': format_tips_mass(mass),
+        'tips_duration_minutes': duration // 60 if duration else None
+    }
+
+
+def fill_tips_summaries():
+    '''
+    Recomputes the brewing summary of all the teas (see tips_summary), e.g.
+    after the format changed. Returns the amount of teas updated.
+    '''
+    teas = list(Tea.select(Tea.id, *[getattr(Tea, field) for field in tips_fields]).dicts())
+
+    with database.atomic():
+        for tea in teas:
+            Tea.update(**tips_summary(tea)).where(Tea.id == tea['id']).execute()
+
+    return len(teas)
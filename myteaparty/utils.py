@@ -1,14 +1,24 @@
+import base64
 import hashlib
+import json
+import math
 import os
 import requests
 import shutil
+import threading
+import time
 
-from flask import request, url_for, g
+from collections import OrderedDict
+from datetime import timezone
+from functools import wraps
+
+from flask import request, url_for, g, abort, make_response
 from flask_pw.debugtoolbar import PeeweeDebugPanel as OrigPeeweeDebugPanel
 from path import Path
 from PIL import Image
 from werkzeug import url_encode
 
+from .model import database
 from .teaparty import app
 
 
@@ -100,12 +110,16 @@ def is_post_processed_file(file_name):
 def update_query(**new_values):
     """
     Modifies and returns the current page's query string
-    by adding or replacing the given values.
+    by adding or replacing the given values, or removing
+    those set to None.
     """
     args = request.args.copy()
 
     for key, value in new_values.items():
-        args[key] = value
+        if value is None:
+            args.pop(key, None)
+        else:
+            args[key] = value
 
     return '{}?{}'.format(request.path, url_encode(args))
 
@@ -162,6 +176,204 @@ def call_after_request_callbacks(response):
     return response
 
 
+def before_first_request(f):
+    '''
+    Decorator registering a function to be executed before the first request
+    of a worker, like Flask's before_first_request, but within a database
+    connection of its own: these functions run before Flask-PW connects for
+    the request, which fails if a connection is already open.
+    '''
+    @wraps(f)
+    def with_connection():
+        if not database.is_closed():
+            return f()
+
+        database.connect()
+        try:
+            return f()
+        finally:
+            database.close()
+
+    app.before_first_request(with_connection)
+    return f
+
+
+def conditional(get_validators, private=False):
+    '''
+    Decorator answering conditional GET requests for a view. get_validators
+    is called with the view arguments, and returns an (etag, last_modified)
+    tuple (any of them can be None). If the request validators match, a 304
+    Not Modified response is returned without calling the view.
+
+    private: if True, the response depends on the user's cookies, and can
+    only be kept by their browser. Only the ETag is used then, as a
+    modification date cannot account for the user's state.
+    '''
+    def decorator(view):
+        @wraps(view)
+        def conditional_view(*args, **kwargs):
+            etag, last_modified = get_validators(*args, **kwargs)
+
+            if private:
+                last_modified = None
+            elif last_modified is not None:
+                # HTTP dates are in UTC, with a one-second precision
+                last_modified = last_modified.astimezone(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+            # If-None-Match takes precedence (RFC 7232, section 6)
+            if request.if_none_match:
+                not_modified = etag is not None and request.if_none_match.contains(etag)
+            else:
+                not_modified = (last_modified is not None and request.if_modified_since is not None
+                                and last_modified <= request.if_modified_since)
+
+            if not_modified:
+                response = app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+
+            if response.status_code in (200, 304):
+                if etag is not None:
+                    response.set_etag(etag)
+                if last_modified is not None:
+                    response.last_modified = last_modified
+
+                # Stored, but always revalidated
+                response.cache_control.no_cache = True
+                if private:
+                    response.cache_control.private = True
+                    response.vary.add('Cookie')
+
+            return response
+
+        return conditional_view
+
+    return decorator
+
+
+class LRUCache(object):
+    '''
+    A bounded in-memory cache, safe to share between threads. When full,
+    the least recently used entries are dropped. If ttl is given, entries
+    also expire after this delay (in seconds).
+    '''
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires_at = self._entries[key]
+            except KeyError:
+                return default
+
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        '''
+        Caches a value. The ttl, if given, overrides the cache's one for this
+        entry.
+        '''
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class KeysetPaginatedList(object):
+    '''
+    Paginates a sorted in-memory listing, with the same interface as playhouse's
+    PaginatedQuery. If the cursor of the previous page is given (in the
+    cursor_var argument), the page starts right after it instead of using the
+    page number, so the results cannot shift between pages.
+
+    listing: an object with a teas sequence and the matching sorted keys
+             sequence (see myteaparty.snapshot.TeasListing).
+    '''
+    def __init__(self, listing, paginate_by, page_var='page', cursor_var='after', check_bounds=True):
+        self.listing = listing
+        self.paginate_by = paginate_by
+        self.page_var = page_var
+        self.cursor_var = cursor_var
+        self.check_bounds = check_bounds
+
+        self._offset = None
+
+    @staticmethod
+    def encode_cursor(values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8'))
+        except ValueError:
+            return None
+
+        return tuple(values) if isinstance(values, list) else None
+
+    def get_page(self):
+        curr_page = request.args.get(self.page_var)
+        if curr_page and curr_page.isdigit():
+            return max(1, int(curr_page))
+        return 1
+
+    def get_page_count(self):
+        return int(math.ceil(float(len(self.listing)) / self.paginate_by))
+
+    def _get_offset(self):
+        if self._offset is not None:
+            return self._offset
+
+        if self.check_bounds and self.get_page() > max(1, self.get_page_count()):
+            abort(404)
+
+        cursor = request.args.get(self.cursor_var)
+        if cursor:
+            key = self.decode_cursor(cursor)
+            try:
+                self._offset = self.listing.index_after(key)
+            except TypeError:
+                # Not comparable with the keys: not a cursor we made
+                abort(404)
+        else:
+            self._offset = (self.get_page() - 1) * self.paginate_by
+
+        return self._offset
+
+    def get_object_list(self):
+        offset = self._get_offset()
+        return self.listing.teas[offset:offset + self.paginate_by]
+
+    def get_next_cursor(self):
+        '''
+        Returns the cursor of the next page, or None if this is the last one.
+        '''
+        last = self._get_offset() + self.paginate_by - 1
+        if last + 1 >= len(self.listing):
+            return None
+
+        return self.encode_cursor(list(self.listing.keys[last]))
+
+
 class PeeweeDebugPanel(OrigPeeweeDebugPanel):
     '''
     Improved Peewee debug panel (with queries amount & total duration in subtitle)
@@ -0,0 +1,88 @@
+import json
+
+from datetime import datetime
+from flask import Response, request, abort, url_for, stream_with_context
+
+from ..snapshot import get_catalog_snapshot
+from ..teaparty import app
+
+
+# The fields of the teas given by the API, besides their vendor, types and URL
+API_TEA_FIELDS = ('id', 'name', 'slug', 'description', 'long_description', 'illustration', 'link', 'price',
+                  'price_unit', 'tips_raw', 'tips_duration', 'tips_mass', 'tips_temperature', 'tips_volume',
+                  'tips_extra', 'tips_max_brews', 'vendor_internal_id', 'updated', 'deleted')
+
+_since_formats = ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d')
+
+
+def parse_since(since):
+    '''
+    Parses the `since` argument of the API: an ISO 8601 date or date and
+    time, without timezone (the server's one). Returns None if invalid.
+    '''
+    for since_format in _since_formats:
+        try:
+            return datetime.strptime(since, since_format)
+        except ValueError:
+            pass
+
+    return None
+
+
+def tea_to_json(tea):
+    data = {field: getattr(tea, field) for field in API_TEA_FIELDS}
+    data.update(
+        vendor=tea.vendor_slug,
+        types=[tea_type.slug for tea_type in tea.types],
+        url=url_for('tea', tea_vendor=tea.vendor_slug, tea_slug=tea.slug, _external=True)
+    )
+
+    for field in ('updated', 'deleted'):
+        if data[field] is not None:
+            data[field] = data[field].isoformat()
+
+    return json.dumps(data, ensure_ascii=False)
+
+
+@app.route('/api/teas')
+def api_teas():
+    '''
+    Streams the catalog as JSON Lines, one tea per line, ordered by when
+    they last changed (updated or deleted). The deleted teas are included,
+    with their deletion date.
+
+    Can be filtered by vendor and type (slugs). To sync incrementally, a
+    client passes the greatest `updated` or `deleted` date it received as
+    `since`; only the teas which changed since then are given.
+    '''
+    snapshot = get_catalog_snapshot()
+
+    vendor = tea_type = since = None
+
+    if request.args.get('vendor'):
+        vendor = snapshot.get_vendor(request.args['vendor'])
+        if vendor is None:
+            abort(404)
+
+    if request.args.get('type'):
+        tea_type = snapshot.get_type(request.args['type'])
+        if tea_type is None:
+            abort(404)
+
+    if request.args.get('since'):
+        since = parse_since(request.args['since'])
+        if since is None:
+            abort(400)
+
+    def generate():
+        # The snapshot is immutable, so the stream is consistent even if an
+        # import commits meanwhile, and nothing is loaded for it
+        for tea in snapshot.iter_changes(since=since):
+            if vendor is not None and tea.vendor is not vendor:
+                continue
+            if tea_type is not None and tea_type not in tea.types:
+                continue
+
+            yield tea_to_json(tea) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -10,8 +10,8 @@ def search_generic_fallback(search_fallback):
 
     if count > 1:
         return redirect(url_for('search', q=search_fallback), 302)
-    elif count == 1:
-        tea = teas.dicts()[0]
+    elif count == 1 and teas:
+        tea = teas[0]
         return redirect(url_for('tea', tea_slug=tea['slug'], tea_vendor=tea['vendor_slug']), 302)
     else:
         abort(404)
@@ -1,18 +1,19 @@
-import os
+import io
 import qrcode
+import qrcode.image.svg
 import random
-import tempfile
 import uuid
 
+from collections import namedtuple
 from datetime import datetime, timedelta
-from flask import jsonify, request, redirect, url_for, render_template, abort, send_file
-from path import Path
-from peewee import fn
-from playhouse.flask_utils import get_object_or_404
+from flask import jsonify, request, redirect, url_for, render_template, abort, g
+from peewee import IntegrityError
 
-from ..model import Tea, TeaList, TeaListItem
+from ..lists_gc import start_lists_gc_scheduler
+from ..model import database, insert_or_ignore, Tea, TeaList, TeaListItem
+from ..snapshot import get_catalog_snapshot
 from ..teaparty import app
-from ..utils import after_request
+from ..utils import LRUCache, after_request, before_first_request
 
 _cookies_properties = {
     'expires': datetime.now() + timedelta(days=366 * 84),
@@ -34,41 +35,88 @@ def create_tea_list(name=None, is_favorites=False):
 
 def add_to_list(tea_list, tea):
     '''
-    Adds a tea to a list. Returns the new list item model instance.
+    Adds a tea (a model or a snapshot record) to a list, in a single
+    statement: the unique index on the list and the tea skips it if it is
+    already there. Returns whether it was added.
     '''
-    item, _ = TeaListItem.get_or_create(
-        tea=tea,
-        tea_list=tea_list,
-        defaults={'is_empty': False}
-    )
-
-    return item
+    return insert_or_ignore(TeaListItem.insert(tea_list=tea_list.id, tea=tea.id, is_empty=False))
 
 
 def remove_from_list(tea_list, tea):
     '''
-    Removes a tea from a list.
+    Removes a tea from a list. Returns whether it was in the list.
+    '''
+    return TeaListItem.delete().where((TeaListItem.tea_list == tea_list.id) & (TeaListItem.tea == tea.id)).execute() > 0
+
+
+def toggle_in_list(tea_list, tea):
+    '''
+    Adds a tea to a list, or removes it if it already was there. No check is
+    made beforehand: the insert is skipped if the tea is there, so a single
+    statement is made to add it, and two to remove it. Returns whether the
+    tea is in the list afterwards.
     '''
-    TeaListItem.delete().where((TeaListItem.tea_list == tea_list) & (TeaListItem.tea == tea)).execute()
+    if add_to_list(tea_list, tea):
+        return True
+
+    remove_from_list(tea_list, tea)
+    return False
 
 
 def set_empty_in_list(tea_list, tea, empty=None):
     '''
-    Marks a tea as empty in a list.
+    Marks a tea as empty in a list, in a single statement.
 
     empty: if None, toggles the value. Else (True/False) sets the given value.
     '''
-    try:
-        item = TeaListItem.get(tea_list=tea_list, tea=tea)
-    except TeaListItem.DoesNotExist:
-        return
+    (TeaListItem.update(is_empty=(1 - TeaListItem.is_empty) if empty is None else empty)
+                .where((TeaListItem.tea_list == tea_list.id) & (TeaListItem.tea == tea.id))
+                .execute())
+
+
+def apply_list_operations(tea_list, operations):
+    '''
+    Applies a batch of operations to a list, in order, with a few multi-rows
+    statements. Must be called in a transaction.
+
+    operations: a list of (operation, tea ID, empty) tuples; the operation is
+    'add', 'remove' or 'empty' (which sets the given empty value, or toggles
+    it if None, of a tea in the list).
+    '''
+    existing = {tea_id: bool(is_empty) for tea_id, is_empty
+                in (TeaListItem.select(TeaListItem.tea, TeaListItem.is_empty)
+                               .where(TeaListItem.tea_list == tea_list)
+                               .tuples())}
+    items = dict(existing)
+
+    for operation, tea_id, empty in operations:
+        if operation == 'add':
+            items.setdefault(tea_id, False)
+        elif operation == 'remove':
+            items.pop(tea_id, None)
+        elif operation == 'empty' and tea_id in items:
+            items[tea_id] = not items[tea_id] if empty is None else empty
+
+    removed = [tea_id for tea_id in existing if tea_id not in items]
+    added = [{'tea_list': tea_list.id, 'tea': tea_id, 'is_empty': is_empty}
+             for tea_id, is_empty in items.items() if tea_id not in existing]
+    changed = [tea_id for tea_id, is_empty in items.items() if tea_id in existing and existing[tea_id] != is_empty]
+
+    # In chunks, so the SQLite variables limit is never reached
+    for start in range(0, len(removed), 500):
+        (TeaListItem.delete()
+                    .where((TeaListItem.tea_list == tea_list) & (TeaListItem.tea << removed[start:start + 500]))
+                    .execute())
 
-    empty_value = empty
-    if empty is None:
-        empty_value = not item.is_empty
+    for start in range(0, len(added), 100):
+        TeaListItem.insert_many(added[start:start + 100]).execute()
 
-    item.is_empty = empty_value
-    item.save()
+    for is_empty in (True, False):
+        changed_to = [tea_id for tea_id in changed if items[tea_id] == is_empty]
+        for start in range(0, len(changed_to), 500):
+            (TeaListItem.update(is_empty=is_empty)
+                        .where((TeaListItem.tea_list == tea_list) & (TeaListItem.tea << changed_to[start:start + 500]))
+                        .execute())
 
 
 def set_favorites_list(response, favorites_list):
@@ -88,26 +136,91 @@ def add_to_registered_lists(response, tea_list):
         response.set_cookie(app.config['COOKIE_LISTS'], '|'.join(registered_lists), **_cookies_properties)
 
 
-def _gen_list_share_key():
+def assign_list_share_key(tea_list, valid_until):
     '''
-    Generates a sharing key (6-digits key) for the list.
-    The key is checked to be unique.
+    Gives the list a new sharing key (6-digits key), valid until the given
+    date, and saves it.
+
+    Random keys are tried until one is free: the unique index rejects the
+    keys in use, and an expired key is released before being tried, so only
+    the unexpired keys are taken. Each attempt is a couple of indexed
+    statements, whatever the amount of lists.
+    '''
+    for _ in range(app.config['SHARE_KEY_ALLOCATION_ATTEMPTS']):
+        share_key = str(random.randint(100000, 999999))
+
+        try:
+            with database.atomic():
+                (TeaList.update(share_key=None, share_key_valid_until=None)
+                        .where((TeaList.share_key == share_key) & (TeaList.share_key_valid_until < datetime.now()))
+                        .execute())
+                (TeaList.update(share_key=share_key, share_key_valid_until=valid_until)
+                        .where(TeaList.id == tea_list.id)
+                        .execute())
+        except IntegrityError:
+            continue
+
+        tea_list.share_key = share_key
+        tea_list.share_key_valid_until = valid_until
+        return share_key
+
+    # Only happens if nearly all the keys are in use
+    abort(503)
+
+
+def _get_lists_keys_from_request():
     '''
-    keys = [tea_list.share_key for tea_list in TeaList.select(TeaList.share_key) if tea_list.share_key is not None]
-    share_key = None
+    Returns the keys of the user's registered lists, and the key of his
+    favorites list (or None), from the cookies.
+    '''
+    registered_lists_keys = [i for i in request.cookies.get(app.config['COOKIE_LISTS'], '').split('|') if i]
+    favorites_list_key = request.cookies.get(app.config['COOKIE_FAVORITES_LIST']) or None
+
+    return registered_lists_keys, favorites_list_key
+
+
+def _get_request_lists():
+    '''
+    Returns the lists known in this request, by cookie key (an identity map
+    kept in flask.g). All the lists referenced by the user's cookies are
+    loaded in it at once, in a single query, the first time it is needed;
+    the lists helpers below all go through it instead of querying the lists
+    each time.
+
+    The lists used for the first time since their creation are marked as
+    revisited then (a single update, once per list), so the lists garbage
+    collector keeps them.
+    '''
+    if not hasattr(g, 'tea_lists'):
+        registered_lists_keys, favorites_list_key = _get_lists_keys_from_request()
+        keys = registered_lists_keys + ([favorites_list_key] if favorites_list_key else [])
+
+        g.tea_lists = {}
+        if keys:
+            g.tea_lists = {tea_list.cookie_key: tea_list
+                           for tea_list in TeaList.select().where(TeaList.cookie_key << keys)}
 
-    while share_key is None or share_key in keys:
-        share_key = random.randint(100000, 999999)
+        now = datetime.now()
+        revisited_before = now - timedelta(hours=app.config['LISTS_REVISIT_DELAY'])
+        revisited = [tea_list for tea_list in g.tea_lists.values()
+                     if tea_list.revisited_at is None and tea_list.created_at < revisited_before]
+        if revisited:
+            TeaList.update(revisited_at=now).where(TeaList.id << [tea_list.id for tea_list in revisited]).execute()
+            for tea_list in revisited:
+                tea_list.revisited_at = now
 
-    return share_key
+    return g.tea_lists
 
 
 def get_tea_lists_from_request():
     '''
     Returns all the user's registered lists.
     '''
-    registered_lists = [i for i in request.cookies.get(app.config['COOKIE_LISTS'], '').split('|') if i]
-    return [tl for tl in TeaList.select().where(TeaList.cookie_key << registered_lists)]
+    registered_lists_keys, _ = _get_lists_keys_from_request()
+    tea_lists = _get_request_lists()
+
+    return sorted({tea_lists[key].id: tea_lists[key] for key in registered_lists_keys if key in tea_lists}.values(),
+                  key=lambda tea_list: tea_list.id)
 
 
 def get_tea_list_from_cookie_key(cookie_key, create=True, abort_if_not_found=True):
@@ -118,15 +231,19 @@ def get_tea_list_from_cookie_key(cookie_key, create=True, abort_if_not_found=Tru
     '''
     if cookie_key == 'favorites':
         return get_favorites_list_from_request(create=create)
-    else:
+
+    tea_lists = _get_request_lists()
+    if cookie_key not in tea_lists:
         try:
-            return TeaList.select().where(TeaList.cookie_key == cookie_key).get()
+            tea_lists[cookie_key] = TeaList.select().where(TeaList.cookie_key == cookie_key).get()
         except TeaList.DoesNotExist:
             if abort_if_not_found:
                 abort(404)
             else:
                 return None
 
+    return tea_lists[cookie_key]
+
 
 def is_list_registered_for_user(tea_list):
     '''
@@ -139,17 +256,18 @@ def get_favorites_list_from_request(create=True):
     '''
     Returns the user's active list. Returns None if there is none.
     '''
-    favorites_list_id = request.cookies.get(app.config['COOKIE_FAVORITES_LIST'])
-    favorites_list = None
+    _, favorites_list_key = _get_lists_keys_from_request()
 
-    if favorites_list_id:
-        try:
-            favorites_list = TeaList.get(TeaList.cookie_key == favorites_list_id)
-        except TeaList.DoesNotExist:
-            favorites_list = None
+    favorites_list = _get_request_lists().get(favorites_list_key)
+
+    # The list created earlier in this request, if any, is not in the cookies yet
+    if favorites_list is None:
+        favorites_list = getattr(g, 'created_favorites_list', None)
 
-    if not favorites_list and create:
+    # (A list is falsy if empty, hence the explicit comparisons)
+    if favorites_list is None and create:
         favorites_list = create_tea_list(name=app.config['LISTS_FAVORITES_NAME'], is_favorites=True)
+        g.created_favorites_list = favorites_list
 
         @after_request
         def set_favorite_cookie(response):
@@ -164,47 +282,96 @@ def get_favorites_list_from_request(create=True):
     return favorites_list
 
 
-def is_tea_in_list(tea_list, tea):
+def get_user_lists_for_tea(tea):
     '''
-    Checks if the given tea is in the given list.
+    Returns the user's registered lists and favorites list (from the cookies)
+    along with whether they contain the given tea. Besides the lists, only
+    one query is made, once per request and tea.
+
+    Returns a tuple (favorites_list, tea_lists, lists_ids_containing_tea);
+    favorites_list is None if the user has none.
     '''
-    return (TeaListItem.select()
-                       .where((TeaListItem.tea_list == tea_list) & (TeaListItem.tea == tea))
-                       .exists())
+    favorites_list = get_favorites_list_from_request(create=False)
+    tea_lists = get_tea_lists_from_request()
+
+    if not hasattr(g, 'lists_containing_tea'):
+        g.lists_containing_tea = {}
+
+    if tea.id not in g.lists_containing_tea:
+        lists_ids = [tea_list.id for tea_list in tea_lists]
+        if favorites_list is not None:
+            lists_ids.append(favorites_list.id)
+        containing = set()
+
+        if lists_ids:
+            containing = {list_id for list_id, in (TeaListItem.select(TeaListItem.tea_list)
+                                                              .where((TeaListItem.tea == tea.id) &
+                                                                     (TeaListItem.tea_list << lists_ids))
+                                                              .tuples())}
+
+        g.lists_containing_tea[tea.id] = containing
+
+    return favorites_list, tea_lists, g.lists_containing_tea[tea.id]
 
 
-def is_tea_in_favorites_list(tea):
+# An item of a LoadedTeaList, its tea coming from the catalog snapshot
+LoadedTeaListItem = namedtuple('LoadedTeaListItem', ('id', 'tea', 'is_empty'))
+
+
+class LoadedTeaList(object):
     '''
-    Checks if the given tea is in the user's active list (if there is any).
+    A user's list along with its items, loaded by load_user_lists. Like a
+    TeaList, it is falsy if empty and iterates over its items, but without
+    querying anything.
     '''
-    # This is checked on every tea page, so if there is no list,
-    # we don't want to create one. Just to check if it's in the list
-    # if it exists.
-    favorites_list = get_favorites_list_from_request(create=False)
-    if not favorites_list:
-        return False
+    def __init__(self, id, name, cookie_key, is_favorites):
+        self.id = id
+        self.name = name
+        self.cookie_key = cookie_key
+        self.is_favorites = is_favorites
+        self.items = []
+
+    def __bool__(self):
+        return bool(self.items)
 
-    return is_tea_in_list(favorites_list, tea)
+    def __iter__(self):
+        return iter(self.items)
 
+    def __len__(self):
+        return len(self.items)
 
-def get_lists_containing_tea(tea_lists, tea):
+
+def load_user_lists():
     '''
-    Checks if the tea is in the given lists.
-    Returns a list of the lists where the tea is into.
+    Loads the user's favorites list and registered lists (from the cookies)
+    with all their items. Besides the lists, only one query is made. The
+    teas of the items come from the catalog snapshot.
+
+    Returns a tuple (favorites_list, tea_lists) of LoadedTeaList;
+    favorites_list is None if the user has none.
     '''
-    return (
-        TeaList
-            .select()
-            .where(
-                (TeaList.id << [tea_list.id for tea_list in tea_lists]) &
-                fn.Exists(
-                    TeaListItem
-                        .select(TeaListItem.id)
-                        .join(Tea, on=TeaListItem.tea_id == Tea.id)
-                        .where((Tea.id == tea.id) & (TeaList.id == TeaListItem.tea_list))
-                )
-            )
-    )
+    favorites_list = get_favorites_list_from_request(create=False)
+    tea_lists = get_tea_lists_from_request()
+
+    user_lists = {tea_list.id: LoadedTeaList(tea_list.id, tea_list.name, tea_list.cookie_key, tea_list.is_favorites)
+                  for tea_list in tea_lists + ([favorites_list] if favorites_list is not None else [])}
+    if not user_lists:
+        return None, []
+
+    items = (TeaListItem.select(TeaListItem.id, TeaListItem.tea_list, TeaListItem.tea, TeaListItem.is_empty)
+                        .where(TeaListItem.tea_list << list(user_lists))
+                        .order_by(TeaListItem.id)
+                        .tuples())
+
+    teas = get_catalog_snapshot().teas_by_id
+
+    for item_id, list_id, tea_id, is_empty in items:
+        # A tea may have been removed from the catalog since the snapshot
+        if tea_id in teas:
+            user_lists[list_id].items.append(LoadedTeaListItem(item_id, teas[tea_id], is_empty))
+
+    return (user_lists[favorites_list.id] if favorites_list is not None else None,
+            [user_lists[tea_list.id] for tea_list in tea_lists])
 
 
 def get_teas_in_list(tea_list, limit=None):
@@ -230,17 +397,6 @@ def get_teas_in_list(tea_list, limit=None):
     return req, count
 
 
-def get_teas_in_favorites_list():
-    '''
-    Returns the teas in the user's active list.
-    '''
-    favorites_list = get_favorites_list_from_request(create=False)
-    if not favorites_list:
-        return []
-
-    return get_teas_in_list(favorites_list)
-
-
 def get_last_viewed_list_key():
     '''
     Returns the key of the last-viewed list on the homepage, to restaure the
@@ -259,6 +415,22 @@ def update_last_viewed_list_key(last_viewed_list):
         response.set_cookie(app.config['COOKIE_LAST_VIEWED_LIST'], last_viewed_list.cookie_key, **_cookies_properties)
 
 
+@before_first_request
+def _start_lists_gc_scheduler():
+    start_lists_gc_scheduler()
+
+
+def _get_tea_or_404(tea_id):
+    '''
+    Returns a tea from the catalog snapshot, or aborts to a 404 error.
+    '''
+    tea = get_catalog_snapshot().teas_by_id.get(tea_id)
+    if tea is None:
+        abort(404)
+
+    return tea
+
+
 def _handle_response(tea, **kwargs):
     '''
     Handles the response of an API call for tea lists endpoints.
@@ -277,7 +449,7 @@ def _handle_response(tea, **kwargs):
 
 @app.route('/lists/<cookie_key>/add/<int:tea_id>', methods=['GET', 'POST'])
 def add_tea_to_list(cookie_key, tea_id):
-    tea = get_object_or_404(Tea, Tea.id == tea_id)
+    tea = _get_tea_or_404(tea_id)
     add_to_list(get_tea_list_from_cookie_key(cookie_key), tea)
 
     return _handle_response(tea, in_list=True)
@@ -285,31 +457,23 @@ def add_tea_to_list(cookie_key, tea_id):
 
 @app.route('/lists/<cookie_key>/remove/<int:tea_id>', methods=['GET', 'POST'])
 def remove_tea_from_list(cookie_key, tea_id):
-    tea = get_object_or_404(Tea, Tea.id == tea_id)
+    tea = _get_tea_or_404(tea_id)
     remove_from_list(get_tea_list_from_cookie_key(cookie_key), tea)
 
-    return _handle_response(tea, in_list=True)
+    return _handle_response(tea, in_list=False)
 
 
 @app.route('/lists/<cookie_key>/toggle/<int:tea_id>', methods=['GET', 'POST'])
 def toggle_tea_in_list(cookie_key, tea_id):
-    tea = get_object_or_404(Tea, Tea.id == tea_id)
-    tea_list = get_tea_list_from_cookie_key(cookie_key)
-    in_list = None
-
-    if is_tea_in_list(tea_list, tea):
-        remove_from_list(tea_list, tea)
-        in_list = False
-    else:
-        add_to_list(tea_list, tea)
-        in_list = True
+    tea = _get_tea_or_404(tea_id)
+    in_list = toggle_in_list(get_tea_list_from_cookie_key(cookie_key), tea)
 
     return _handle_response(tea, in_list=in_list)
 
 
 @app.route('/lists/create_and_add/<int:tea_id>', methods=['GET', 'POST'])
 def create_and_add_to_list(tea_id):
-    tea = get_object_or_404(Tea, Tea.id == tea_id)
+    tea = _get_tea_or_404(tea_id)
     tea_list = create_tea_list(name=request.args.get('name', None))
 
     add_to_list(tea_list, tea)
@@ -329,12 +493,98 @@ def create_and_add_to_list(tea_id):
 
 @app.route('/lists/<cookie_key>/toggle_empty/<int:tea_id>', methods=['GET', 'POST'])
 def toggle_empty_tea_in_list(cookie_key, tea_id):
-    tea = get_object_or_404(Tea, Tea.id == tea_id)
+    tea = _get_tea_or_404(tea_id)
     set_empty_in_list(get_tea_list_from_cookie_key(cookie_key), tea)
 
     return _handle_response(tea)
 
 
+def _parse_list_operations(data):
+    '''
+    Validates the operations sent to the batch endpoint, as a list of
+    (operation, tea ID, empty) tuples, or returns None if invalid.
+    '''
+    if not isinstance(data, list) or len(data) > app.config['LISTS_BATCH_MAX_OPERATIONS']:
+        return None
+
+    teas = get_catalog_snapshot().teas_by_id
+    operations = []
+
+    for operation in data:
+        if not isinstance(operation, dict) or operation.get('op') not in ('add', 'remove', 'empty'):
+            return None
+
+        tea_id, empty = operation.get('tea'), operation.get('empty')
+        if type(tea_id) is not int or tea_id not in teas or empty not in (None, True, False):
+            return None
+
+        operations.append((operation['op'], tea_id, empty))
+
+    return operations
+
+
+@app.route('/lists/<cookie_key>/batch', methods=['POST'])
+def batch_update_list(cookie_key):
+    '''
+    Applies several operations to a list at once, in a single transaction.
+    Takes a JSON array of operations, each one being an object with:
+
+    - op: 'add', 'remove', or 'empty' (marks a tea of the list as empty);
+    - tea: the tea ID;
+    - empty: for 'empty' only, the value to set (toggled if not given).
+
+    Returns the resulting items of the list.
+    '''
+    operations = _parse_list_operations(request.get_json(silent=True))
+    if operations is None:
+        abort(400)
+
+    tea_list = get_tea_list_from_cookie_key(cookie_key)
+
+    with database.atomic():
+        apply_list_operations(tea_list, operations)
+
+    items = (TeaListItem.select(TeaListItem.tea, TeaListItem.is_empty)
+                        .where(TeaListItem.tea_list == tea_list)
+                        .order_by(TeaListItem.id)
+                        .tuples())
+
+    return jsonify({
+        'result': 'ok',
+        'items': [{'tea': tea_id, 'is_empty': bool(is_empty)} for tea_id, is_empty in items]
+    })
+
+
+@app.route('/lists/for/<int:tea_id>')
+def user_lists_for_tea(tea_id):
+    '''
+    The user's lists, and whether they contain the given tea. The tea pages
+    rendered without the user's lists (as the exported ones, see the
+    export-static command) load them from here.
+    '''
+    tea = _get_tea_or_404(tea_id)
+
+    favorites_list, tea_lists, lists_ids_containing_tea = get_user_lists_for_tea(tea)
+    in_favorites = favorites_list is not None and favorites_list.id in lists_ids_containing_tea
+
+    response = jsonify({
+        'in_favorites': in_favorites,
+        'favorites_url': url_for('remove_tea_from_list' if in_favorites else 'add_tea_to_list',
+                                 tea_id=tea.id, cookie_key='favorites'),
+        'lists': [{
+            'name': tea_list.name,
+            'in_list': tea_list.id in lists_ids_containing_tea,
+            'toggle_url': url_for('toggle_tea_in_list', tea_id=tea.id, cookie_key=tea_list.cookie_key)
+        } for tea_list in tea_lists]
+    })
+
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+
+    return response
+
+
 @app.route('/lists/switch_last_viewed/<cookie_key>')
 def switch_last_viewed_list(cookie_key):
     update_last_viewed_list_key(get_tea_list_from_cookie_key(cookie_key))
@@ -355,9 +605,7 @@ def sync_list():
                 or tea_list.share_key is None
                 or tea_list.share_key_valid_until is None
                 or tea_list.share_key_valid_until < now):
-            tea_list.share_key = _gen_list_share_key()
-            tea_list.share_key_valid_until = now + timedelta(hours=app.config['SHARE_KEY_EXPIRES_AFTER'])
-            tea_list.save()
+            assign_list_share_key(tea_list, now + timedelta(hours=app.config['SHARE_KEY_EXPIRES_AFTER']))
 
     return render_template(
         'sync.html',
@@ -366,30 +614,67 @@ def sync_list():
     )
 
 
-@app.route('/sync/qr/<int:share_key>')
-def sync_code_qr(share_key):
-    url = url_for('sync_list_newdevice', share_key=share_key, _external=True)
-
+def render_sync_qr_code(url, image_format):
+    '''
+    Renders a QR code for the given URL, in memory, as a JPEG or SVG image.
+    Returns the image data.
+    '''
     qr = qrcode.QRCode(
         box_size=6,
-        border=2
+        border=2,
+        image_factory=qrcode.image.svg.SvgPathFillImage if image_format == 'svg' else None
     )
 
     qr.add_data(url)
     qr.make(fit=True)
 
-    qr_img = qr.make_image(fill_color="white", back_color="#222")
+    qr_io = io.BytesIO()
+
+    if image_format == 'svg':
+        qr.make_image().save(qr_io)
+    else:
+        qr.make_image(fill_color="white", back_color="#222").save(qr_io, 'JPEG', quality=70)
 
-    qr_io, qr_io_path = tempfile.mkstemp(suffix='.jpeg')
-    qr_io = os.fdopen(qr_io)
+    return qr_io.getvalue()
 
-    qr_img.save(qr_io, 'JPEG', quality=70)
 
-    @after_request
-    def cleanup(request):
-        Path(qr_io_path).remove()
+_qr_codes_cache = LRUCache(app.config['QR_CODES_CACHE_SIZE'])
+
+
+@app.route('/sync/qr/<int:share_key>', defaults={'image_format': 'jpeg'})
+@app.route('/sync/qr/<int:share_key>.<any(jpeg, svg):image_format>')
+def sync_code_qr(share_key, image_format):
+    '''
+    The QR code of a sharing key. They are cached until the key expires, so
+    reloading the sync page does not render them again.
+    '''
+    cached = _qr_codes_cache.get((share_key, image_format))
+
+    if cached is None:
+        try:
+            # Through the model, so the date is converted (scalar() gives
+            # the raw value, a string with SQLite)
+            valid_until = (TeaList.select(TeaList.share_key_valid_until)
+                                  .where((TeaList.share_key == str(share_key)) &
+                                         (TeaList.share_key_valid_until > datetime.now()))
+                                  .get()
+                                  .share_key_valid_until)
+        except TeaList.DoesNotExist:
+            abort(404)
+
+        url = url_for('sync_list_newdevice', share_key=share_key, _external=True)
+        cached = (render_sync_qr_code(url, image_format), valid_until)
+
+        _qr_codes_cache.set((share_key, image_format), cached,
+                            ttl=(valid_until - datetime.now()).total_seconds())
+
+    qr_data, valid_until = cached
+
+    response = app.response_class(qr_data, mimetype='image/svg+xml' if image_format == 'svg' else 'image/jpeg')
+    response.cache_control.private = True
+    response.expires = valid_until
 
-    return send_file(qr_io_path, mimetype='image/jpeg')
+    return response
 
 
 @app.route('/s/<share_key>')
@@ -1,13 +1,14 @@
 from flask import render_template
 
-from .lists import get_teas_in_favorites_list, get_tea_lists_from_request, get_last_viewed_list_key
-from ..model import TeaVendor
+from .lists import load_user_lists, get_last_viewed_list_key
+from ..snapshot import get_vendors
 from ..teaparty import app
 
 
 @app.route('/')
 def homepage():
-    lists_teas = get_tea_lists_from_request()
+    # All the lists and their teas are loaded at once
+    favorites_list, lists_teas = load_user_lists()
     last_viewed_list_key = get_last_viewed_list_key()
 
     if last_viewed_list_key not in [tea_list.cookie_key for tea_list in lists_teas]:
@@ -15,13 +16,13 @@ def homepage():
 
     return render_template(
         'index.html',
-        favorites_list_teas=get_teas_in_favorites_list(),
+        favorites_list_teas=favorites_list or [],
         lists_teas=lists_teas,
         last_viewed_list_key=last_viewed_list_key,
-        vendors=TeaVendor.select().order_by(TeaVendor.order)
+        vendors=get_vendors()
     )
 
 
 @app.route('/about')
 def about():
-    return render_template('about.html', vendors=TeaVendor.select().order_by(TeaVendor.order))
+    return render_template('about.html', vendors=get_vendors())
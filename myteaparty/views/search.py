@@ -1,68 +1,90 @@
 import math
 
-from flask import request, render_template, redirect, url_for, abort
-from peewee import SQL, fn
+from flask import request, render_template, redirect, url_for, abort, jsonify
 
-from ..model import Tea, TeaVendor
+from ..catalog import get_catalog_generation
+from ..search import SearchHits, get_search_backend
+from ..search.normalize import fold
+from ..search.suggestions import SUGGESTION_TEA, SUGGESTION_VENDOR, get_suggestions, get_suggestions_index
+from ..search.trigrams import find_similar_teas, get_trigram_index
 from ..teaparty import app
+from ..utils import LRUCache, before_first_request
 
 
-def search_for_tea(search_query, paginate_by=0, page=1):
+_search_cache = LRUCache(app.config['SEARCH_CACHE_SIZE'], ttl=app.config['SEARCH_CACHE_TTL'])
+
+
+def search_for_tea(search_query, paginate_by=0, page=1, after=None):
     """
-    Searchs for teas using the given query and returns a peewee query
-    with the results.
+    Searchs for teas using the given query and returns a list of dicts
+    with the results, using the configured search backend.
 
     If paginate_by and page are given (and positive), paginates the
-    results and returns a tuple with the peewee query, the total number
+    results and returns a tuple with the results, the total number
     of results and the pages count. If search_query evaluates to False,
-    returns [] instead of a peewee query.
+    returns [] instead of the results.
+
+    If after is given (the search_token of the last result of the previous
+    page), the page starts right after this result instead of using the
+    page number.
+
+    If nothing matches and SEARCH_TYPO_TOLERANCE is enabled, the teas with
+    a similar name are returned instead.
+
+    All the matching IDs are searched at once and cached by normalized
+    query until the next import, so the count and every page are taken
+    from them. Loaded pages are cached too.
     """
+    search_query = fold(search_query)
     if not search_query:
         return [] if paginate_by <= 0 else [], 0, 0
 
-    search_terms = search_query.split()
-
-    relevance = SQL('0')
-    where_clause = SQL('1')
-    for word in search_terms:
-        relevance += (fn.IF(Tea.name.contains(word), app.config['SEARCH_WEIGHTS']['name'], 0) +
-                      fn.IF(Tea.vendor_internal_id == word, app.config['SEARCH_WEIGHTS']['vendor_code'], 0) +
-                      fn.IF(Tea.description.contains(word), app.config['SEARCH_WEIGHTS']['desc'], 0) +
-                      fn.IF(Tea.long_description.contains(word), app.config['SEARCH_WEIGHTS']['ldesc'], 0))
-        where_clause &= ((Tea.name.contains(word)) |
-                         (Tea.vendor_internal_id == word) |
-                         (Tea.description.contains(word)) |
-                         (Tea.long_description.contains(word)))
-
-    teas = (Tea
-            .select(
-                Tea.name,
-                Tea.slug,
-                Tea.description,
-                Tea.illustration,
-                Tea.tips_raw,
-                Tea.tips_mass,
-                Tea.tips_volume,
-                Tea.tips_duration,
-                Tea.tips_temperature,
-                TeaVendor.name.alias('vendor_name'),
-                TeaVendor.slug.alias('vendor_slug'),
-                relevance.alias('relevance'))
-            .join(TeaVendor)
-            .where(where_clause)
-            .having(SQL('relevance') != 0)
-            .order_by(SQL('relevance DESC')))
-
-    if paginate_by > 0:
-        count = Tea.select().where(where_clause).count()
-        pages_count = int(math.ceil(float(count) / paginate_by))
+    generation = get_catalog_generation()
+
+    hits = _search_cache.get((generation, search_query))
+    if hits is None:
+        hits = SearchHits(get_search_backend().find(search_query.split()))
+        if not hits and app.config['SEARCH_TYPO_TOLERANCE']:
+            hits = SearchHits(find_similar_teas(search_query,
+                                                min_similarity=app.config['SEARCH_TYPO_MIN_SIMILARITY'],
+                                                limit=app.config['SEARCH_TYPO_MAX_RESULTS']))
+        _search_cache.set((generation, search_query), hits)
 
+    if paginate_by <= 0:
+        return _load_search_page(generation, search_query, hits, None, 0)
+
+    pages_count = int(math.ceil(float(len(hits)) / paginate_by))
+
+    if after:
+        offset = hits.offset_after(after)
+        if offset is None:
+            abort(404)
+    else:
         if page != 1 and page > pages_count:
             abort(404)
 
-        teas = teas.paginate(page, paginate_by)
+        offset = (page - 1) * paginate_by
+
+    return _load_search_page(generation, search_query, hits, paginate_by, offset), len(hits), pages_count
+
 
-    return teas if paginate_by <= 0 else (teas, count, pages_count)
+def _load_search_page(generation, search_query, hits, limit, offset):
+    page_key = (generation, search_query, limit, offset)
+
+    teas = _search_cache.get(page_key)
+    if teas is None:
+        teas = get_search_backend().load_results(hits.page(limit, offset))
+        _search_cache.set(page_key, teas)
+
+    return teas
+
+
+@before_first_request
+def _prepare_search_backend():
+    get_search_backend().refresh()
+    get_suggestions_index()
+    if app.config['SEARCH_TYPO_TOLERANCE']:
+        get_trigram_index()
 
 
 @app.route('/search')
@@ -72,13 +94,39 @@ def search():
 
     page = max(1, int(page) if page and page.isdigit() else 1)
 
-    teas, count, pages_count = search_for_tea(search_query, paginate_by=app.config['ITEMS_PER_PAGE'], page=page)
+    teas, count, pages_count = search_for_tea(search_query, paginate_by=app.config['ITEMS_PER_PAGE'], page=page,
+                                              after=request.args.get('after'))
 
-    if count == 1:
-        tea = teas.dicts()[0]
+    if count == 1 and teas:
+        tea = teas[0]
         return redirect(url_for('tea', tea_slug=tea['slug'], tea_vendor=tea['vendor_slug']), 302)
 
     return render_template('search.html', search_query=search_query, teas=teas, pagination={
         'page': page,
-        'pages': pages_count
+        'pages': pages_count,
+        'next_after': teas[-1]['search_token'] if teas else None
     })
+
+
+@app.route('/search/suggest')
+def search_suggest():
+    suggestions = []
+
+    for suggestion in get_suggestions(request.args.get('q', ''), app.config['SEARCH_SUGGESTIONS_LIMIT']):
+        if suggestion.kind == SUGGESTION_TEA:
+            label = f'{suggestion.name} ({suggestion.vendor_name})'
+            url = url_for('tea', tea_vendor=suggestion.vendor_slug, tea_slug=suggestion.slug)
+        elif suggestion.kind == SUGGESTION_VENDOR:
+            label = suggestion.name
+            url = url_for('by_vendor', vendor_slug=suggestion.slug)
+        else:
+            label = suggestion.name
+            url = url_for('by_type', tea_type_slug=suggestion.slug)
+
+        suggestions.append({'kind': suggestion.kind, 'label': label, 'url': url})
+
+    response = jsonify({'suggestions': suggestions})
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['CATALOG_GENERATION_CHECK_INTERVAL']
+
+    return response
@@ -1,109 +1,170 @@
-from flask import render_template, redirect, url_for
-from playhouse.flask_utils import get_object_or_404, PaginatedQuery
+import hashlib
 
-from .lists import is_tea_in_favorites_list, get_tea_lists_from_request, get_lists_containing_tea
-from ..model import Tea, TeaVendor, TeaType, TypeOfATea
+from flask import render_template, redirect, url_for, abort, request
+from functools import wraps
+
+from .lists import get_user_lists_for_tea
+from ..catalog import get_catalog_generation, get_catalog_last_modified
+from ..snapshot import get_catalog_snapshot
 from ..teaparty import app
+from ..utils import LRUCache, KeysetPaginatedList, before_first_request, conditional
+
+
+_listings_cache = LRUCache(app.config['LISTINGS_CACHE_SIZE'])
+
+
+def cached_listing(view):
+    '''
+    Caches the pages rendered by a catalog listing view, by path, page and
+    catalog generation: as an import bumps the generation when it commits,
+    the pages rendered before are never served again after it.
+
+    Only the requests without other arguments than the page (and its cursor)
+    are cached, as the rendered links keep the current arguments.
+    '''
+    @wraps(view)
+    def cached_view(*args, **kwargs):
+        if not set(request.args.keys()) <= {'page', 'after'}:
+            return view(*args, **kwargs)
+
+        key = (get_catalog_generation(), request.path, request.args.get('page'), request.args.get('after'))
+        page = _listings_cache.get(key)
+
+        if page is None:
+            page = view(*args, **kwargs)
+
+            # Redirections and other responses are not cached
+            if isinstance(page, str):
+                _listings_cache.set(key, page)
+
+        return page
+
+    return cached_view
+
+
+def paginate_listing(snapshot, tea_type=None, vendor=None):
+    '''
+    Paginates the (non-deleted) teas of the given type or vendor, or all of
+    them, ordered by vendor, name and id.
+    '''
+    return KeysetPaginatedList(snapshot.get_listing(tea_type=tea_type, vendor=vendor),
+                               paginate_by=app.config['ITEMS_PER_PAGE'])
+
+
+def listing_pagination(teas):
+    return {
+        'page': teas.get_page(),
+        'pages': teas.get_page_count(),
+        'next_after': teas.get_next_cursor()
+    }
+
+
+def listing_validators(*args, **kwargs):
+    '''
+    The catalog listings only change with the catalog.
+    '''
+    return f'catalog-{get_catalog_generation()}', get_catalog_last_modified()
+
+
+def tea_validators(tea_vendor, tea_slug):
+    '''
+    The tea page changes with the tea, the catalog, the lists registered in
+    the user's cookies, and which of them contain the tea. The tea comes from
+    the catalog snapshot, and the lists are loaded once for the request (see
+    get_user_lists_for_tea), so the view does not query them again.
+
+    No modification date is given: the page depends on the user's lists,
+    which the ETag accounts for.
+    '''
+    tea = get_catalog_snapshot().get_tea(tea_vendor.strip().lower(), tea_slug.strip().lower())
+    if tea is None:
+        return None, None
+
+    registered_lists_keys = request.cookies.get(app.config['COOKIE_LISTS'], '')
+    favorites_list_key = request.cookies.get(app.config['COOKIE_FAVORITES_LIST'], '')
+
+    _, _, lists_ids_containing_tea = get_user_lists_for_tea(tea)
+    lists_ids = sorted(lists_ids_containing_tea)
+
+    state = (f'{get_catalog_generation()}|{tea.id}|{tea.updated}|'
+             f'{registered_lists_keys}|{favorites_list_key}|{lists_ids}')
+
+    return hashlib.sha1(state.encode('utf-8')).hexdigest(), None
+
+
+@before_first_request
+def _load_catalog_snapshot():
+    get_catalog_snapshot()
 
 
 @app.route('/<tea_vendor>/<tea_slug>')
+@conditional(tea_validators, private=True)
 def tea(tea_vendor, tea_slug):
-    tea = get_object_or_404(Tea.select().join(TeaVendor),
-                            Tea.slug == tea_slug.strip().lower(),
-                            TeaVendor.slug == tea_vendor.strip().lower())
-
-    tea_types = (TeaType.select(TeaType.name, TeaType.slug)
-                 .join(TypeOfATea)
-                 .where(TypeOfATea.tea == tea)
-                 .order_by(TeaType.is_origin, TeaType.order))
-
-    tea_tips_short = ''
-    if tea.tips_mass:
-        if tea.tips_mass > 0:
-            tea_tips_short += (str(tea.tips_mass / 1000).replace('.', ',') + 'g')
-        else:
-            tea_tips_short += str(-int(tea.tips_mass)) + ' sachets'
-    if tea.tips_volume:
-        tea_tips_short += f'{" dans " if tea.tips_mass else ""}{tea.tips_volume} cL'
-    if tea.tips_temperature:
-        tea_tips_short += f'{" d&rsquo;eau à " if tea_tips_short else ""}{tea.tips_temperature}°C'
-    if tea.tips_duration:
-        tea_tips_short += (f'{", pendant " if tea_tips_short else ""}{tea.tips_duration // 60}'
-                           f' minute{"s" if tea.tips_duration >= 120 else ""}')
-    if tea_tips_short:
-        tea_tips_short += '.'
-
-    tea_lists = get_tea_lists_from_request()
+    # The catalog data comes from the snapshot; only the user's lists are
+    # queried
+    tea = get_catalog_snapshot().get_tea(tea_vendor.strip().lower(), tea_slug.strip().lower())
+    if tea is None:
+        abort(404)
+
+    favorites_list, tea_lists, lists_ids_containing_tea = get_user_lists_for_tea(tea)
 
     return render_template(
         'tea.html',
         tea=tea,
-        tea_tips_short=tea_tips_short,
-        tea_types=tea_types,
-        is_in_list=is_tea_in_favorites_list(tea),
+        tea_types=tea.types,
+        is_in_list=favorites_list is not None and favorites_list.id in lists_ids_containing_tea,
         tea_lists=tea_lists,
-        tea_lists_containing=[tea_list.id for tea_list in get_lists_containing_tea(tea_lists, tea)]
+        tea_lists_containing=lists_ids_containing_tea,
+        user_lists_loaded=favorites_list is not None or bool(tea_lists)
     )
 
 
 @app.route('/teas')
+@conditional(listing_validators)
+@cached_listing
 def all_teas():
-    types = TeaType.select().where(TeaType.is_origin == False).order_by(TeaType.order)  # noqa
-    teas = PaginatedQuery(
-            (Tea.select(Tea, TeaVendor).join(TeaVendor)),
-            paginate_by=app.config['ITEMS_PER_PAGE'],
-            page_var='page',
-            check_bounds=True
-    )
+    snapshot = get_catalog_snapshot()
+    teas = paginate_listing(snapshot)
 
-    return render_template('tea_types.html', teas=teas, types=types, tea_type=None, all=True, pagination={
-        'page': teas.get_page(),
-        'pages': teas.get_page_count()
-    })
+    return render_template('tea_types.html', teas=teas, types=snapshot.get_types(is_origin=False), tea_type=None,
+                           all=True, counts=snapshot.counts, pagination=listing_pagination(teas))
 
 
 @app.route('/type/<tea_type_slug>')
+@conditional(listing_validators)
+@cached_listing
 def by_type(tea_type_slug):
-    tea_type = get_object_or_404(TeaType, TeaType.slug == tea_type_slug)
-    types = TeaType.select().where(TeaType.is_origin == tea_type.is_origin).order_by(TeaType.order)
-    teas = PaginatedQuery(
-            (Tea.select(Tea, TeaVendor)
-                .join(TypeOfATea)
-                .join(TeaType)
-                .where(TypeOfATea.tea_type == tea_type)
-                .switch(Tea)
-                .join(TeaVendor)),
-            paginate_by=app.config['ITEMS_PER_PAGE'],
-            page_var='page',
-            check_bounds=True
-    )
+    snapshot = get_catalog_snapshot()
 
-    return render_template('tea_types.html', teas=teas, types=types, tea_type=tea_type, all=False, pagination={
-        'page': teas.get_page(),
-        'pages': teas.get_page_count()
-    })
+    tea_type = snapshot.get_type(tea_type_slug)
+    if tea_type is None:
+        abort(404)
+
+    teas = paginate_listing(snapshot, tea_type=tea_type)
+
+    return render_template('tea_types.html', teas=teas, types=snapshot.get_types(is_origin=tea_type.is_origin),
+                           tea_type=tea_type, all=False, counts=snapshot.counts,
+                           pagination=listing_pagination(teas))
 
 
 @app.route('/vendor', defaults={'vendor_slug': None})
 @app.route('/vendors', defaults={'vendor_slug': None})
 @app.route('/vendor/<vendor_slug>')
+@conditional(listing_validators)
+@cached_listing
 def by_vendor(vendor_slug):
+    snapshot = get_catalog_snapshot()
+
     if vendor_slug is None:
-        return redirect(url_for('by_vendor',
-                                vendor_slug=TeaVendor.select(TeaVendor.slug).order_by(TeaVendor.order).first().slug))
-
-    vendor = get_object_or_404(TeaVendor, TeaVendor.slug == vendor_slug)
-    vendors = TeaVendor.select().order_by(TeaVendor.order)
-    teas = PaginatedQuery(
-            (Tea.select(Tea, TeaVendor)
-                .join(TeaVendor)
-                .where(Tea.vendor == vendor)),
-            paginate_by=app.config['ITEMS_PER_PAGE'],
-            page_var='page',
-            check_bounds=True
-    )
+        if not snapshot.vendors:
+            abort(404)
+        return redirect(url_for('by_vendor', vendor_slug=snapshot.vendors[0].slug))
 
-    return render_template('tea_vendors.html', vendors=vendors, teas=teas, tea_vendor=vendor, pagination={
-        'page': teas.get_page(),
-        'pages': teas.get_page_count()
-    })
+    vendor = snapshot.get_vendor(vendor_slug)
+    if vendor is None:
+        abort(404)
+
+    teas = paginate_listing(snapshot, vendor=vendor)
+
+    return render_template('tea_vendors.html', vendors=snapshot.vendors, teas=teas, tea_vendor=vendor,
+                           counts=snapshot.counts, pagination=listing_pagination(teas))